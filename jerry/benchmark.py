@@ -0,0 +1,323 @@
+"""
+Benchmarks for the simulation's hot paths and for whole generations. Run from the repository root with:
+    python -m jerry.benchmark --output benchmark.json
+Results are printed and written as JSON along with the commit and platform they were measured on, so runs on
+different commits can be compared. Use --only to run some of the benchmarks, see BENCHMARKS for their names.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import neat
+import numpy as np
+import pymunk
+
+from jerry import evaluation, network, physics
+from jerry.body import BodyCommand
+from jerry.body_config import collision_types
+from jerry.simulations import backflip, walking
+
+STEPS = 2000  # physics steps per measurement
+REPEAT = 5  # measurements per benchmark, the fastest is reported
+SEED = 1  # seeds every random genome, so each run benchmarks the same networks
+MUTATIONS = 30  # mutations applied to each new genome, grows them to sizes typical after a few dozen generations
+ACTIVATIONS = 20000  # network activations per measurement
+GENERATIONS = 3  # generations per end-to-end measurement
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_callback_space(body):
+    """
+    Builds a space where self collisions are rejected by Python begin callbacks instead of shape filters, the way
+    create_space used to work
+    :param body: Body to add to the space
+    :return: pymunk space
+    """
+
+    def dont_collide(arbiter, space, data):
+        return False
+
+    def fall(arbiter, space, data):
+        return True
+
+    space = pymunk.Space()
+    space.gravity = (0.0, -900.0)
+    space.add_collision_handler(collision_types["upper"], collision_types["upper"]).begin = dont_collide
+    space.add_collision_handler(collision_types["lower"], collision_types["upper"]).begin = dont_collide
+    space.add_collision_handler(collision_types["lower"], collision_types["lower"]).begin = dont_collide
+    space.add_collision_handler(collision_types["upper"], collision_types["ground"]).begin = fall
+    physics.add_ground(space)
+
+    body.set_shape_filter(pymunk.ShapeFilter())
+    body.add_to_space(space)
+    return space
+
+
+def create_filtered_space(body):
+    """
+    Builds a space with physics.create_space, where self collisions are rejected by shape filters
+    :param body: Body to add to the space
+    :return: pymunk space
+    """
+    space = physics.create_space(lambda shape: None)
+    body.add_to_space(space)
+    return space
+
+
+def time_physics_steps(create_space):
+    """
+    Steps a walking body while swinging every joint back and forth, so limbs cross each other and hit the ground
+    :param create_space: function that builds a space containing the given body
+    :return: seconds spent stepping the space
+    """
+    body = walking.WalkingConfig().get_body()
+    space = create_space(body)
+
+    start = time.perf_counter()
+    for step in range(STEPS):
+        body.apply_command([math.sin(step / 10)] * len(BodyCommand._fields))
+        space.step(physics.PERIOD)
+    return time.perf_counter() - start
+
+
+def best_time(function, repeat=REPEAT):
+    """
+    :return: the shortest of several measurements, in seconds
+    """
+    return min(function() for _ in range(repeat))
+
+
+def create_genomes(simulation_config, neat_config):
+    """
+    Creates a seeded population and mutates every genome MUTATIONS times
+    :return: list of genomes
+    """
+    random.seed(SEED)
+    genomes = list(neat.Population(neat_config).population.values())
+    for genome in genomes:
+        for _ in range(MUTATIONS):
+            genome.mutate(neat_config.genome_config)
+    return genomes
+
+
+def benchmark_physics():
+    """
+    :return: physics steps per second of one body in a create_space space
+    """
+    return {"steps_per_second": STEPS / best_time(lambda: time_physics_steps(create_filtered_space))}
+
+
+def benchmark_collision_filtering():
+    """
+    :return: physics steps per second with Python collision callbacks and with shape filters
+    """
+    return {"python_callbacks_steps_per_second": STEPS / best_time(lambda: time_physics_steps(create_callback_space)),
+            "shape_filters_steps_per_second": STEPS / best_time(lambda: time_physics_steps(create_filtered_space))}
+
+
+def benchmark_body_io():
+    """
+    :return: microseconds per step spent reading the body's state and setting its joints, through get_state and
+    set_rates and through the buffer based read_state and apply_command
+    """
+    body = walking.WalkingConfig().get_body()
+    command = BodyCommand(*[0.5] * len(BodyCommand._fields))
+
+    def time_named_tuples():
+        start = time.perf_counter()
+        for _ in range(STEPS):
+            body.get_state()
+            body.set_rates(command)
+        return time.perf_counter() - start
+
+    def time_buffers():
+        start = time.perf_counter()
+        for _ in range(STEPS):
+            body.read_state()
+            body.apply_command(command)
+        return time.perf_counter() - start
+
+    return {"get_state_set_rates_us": best_time(time_named_tuples) / STEPS * 1e6,
+            "read_state_apply_command_us": best_time(time_buffers) / STEPS * 1e6}
+
+
+def benchmark_activation():
+    """
+    :return: network activations per second of walking genomes, for neat's FeedForwardNetwork, compiled networks,
+    and a whole population in one BatchNetwork, along with the average genome size
+    """
+    simulation_config = walking.WalkingConfig()
+    neat_config = simulation_config.get_neat_config()
+    genomes = create_genomes(simulation_config, neat_config)
+    inputs = [0.1] * len(neat_config.genome_config.input_keys)
+    rounds = ACTIVATIONS // len(genomes)
+    activations = rounds * len(genomes)
+
+    def time_networks(networks):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for net in networks:
+                net.activate(inputs)
+        return time.perf_counter() - start
+
+    feed_forward = [neat.nn.FeedForwardNetwork.create(genome, neat_config) for genome in genomes]
+    compiled = [network.CompiledNetwork(network.generate_source(genome, neat_config)) for genome in genomes]
+    batch = network.BatchNetwork(genomes, neat_config)
+    batch_inputs = np.array([inputs] * len(genomes))
+
+    def time_batch():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            batch.activate(batch_inputs)
+        return time.perf_counter() - start
+
+    return {"nodes": statistics.mean(len(genome.nodes) for genome in genomes),
+            "enabled_connections": statistics.mean(sum(1 for c in genome.connections.values() if c.enabled)
+                                                   for genome in genomes),
+            "feed_forward_per_second": activations / best_time(lambda: time_networks(feed_forward)),
+            "compiled_per_second": activations / best_time(lambda: time_networks(compiled)),
+            "batch_per_second": activations / best_time(time_batch)}
+
+
+def benchmark_episodes():
+    """
+    :return: full headless walking episodes and physics steps per second, simulated one genome at a time
+    """
+    simulation_config = walking.WalkingConfig()
+    neat_config = simulation_config.get_neat_config()
+    genomes = create_genomes(simulation_config, neat_config)
+    network.compiled_networks.clear()
+
+    def time_episodes():
+        start = time.perf_counter()
+        for genome in genomes:
+            evaluation.evaluate_genome(genome, neat_config, simulation_config)
+        return time.perf_counter() - start
+
+    seconds = best_time(time_episodes)
+    steps = 0
+    for genome in genomes:
+        evaluation.evaluate_genome(genome, neat_config, simulation_config)
+        steps += evaluation.get_context(simulation_config).run_terminator.steps
+    return {"episodes_per_second": len(genomes) / seconds, "steps_per_second": steps / seconds}
+
+
+def time_generations(simulation_config):
+    """
+    Runs GENERATIONS generations of a seeded population in this process, including NEAT's reproduction and speciation
+    :return: average seconds per generation
+    """
+    neat_config = simulation_config.get_neat_config()
+    network.compiled_networks.clear()  # every run compiles its networks from scratch
+    random.seed(SEED)
+    pop = neat.Population(neat_config)
+
+    def fitness_function(genomes, config):
+        population = [genome for genome_id, genome in genomes]
+        fitnesses = evaluation.evaluate_in_batches(population, config, simulation_config, 1)
+        for genome, fitness in zip(population, fitnesses):
+            genome.fitness = fitness
+
+    # the backflip motion calculator prints every step, which would drown out the results
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        pop.run(fitness_function, n=GENERATIONS)
+        return (time.perf_counter() - start) / GENERATIONS
+
+
+def benchmark_generations():
+    """
+    :return: seconds per generation for walking and backflip, evaluated serially
+    """
+    return {"walking_seconds": time_generations(walking.WalkingConfig()),
+            "backflip_seconds": time_generations(backflip.BackflipConfig())}
+
+
+def time_import(module):
+    """
+    :return: seconds taken by a new interpreter to import module, minus the interpreter's own startup time
+    """
+
+    def time_command(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=REPOSITORY_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+    startup = best_time(lambda: time_command("pass"))
+    return best_time(lambda: time_command("import {}".format(module))) - startup
+
+
+def benchmark_imports():
+    """
+    :return: seconds to import the headless evaluation core and the whole training script
+    """
+    return {"evaluation_seconds": time_import("jerry.evaluation"),
+            "train_seconds": time_import("jerry.train")}
+
+
+BENCHMARKS = {
+    "physics": benchmark_physics,
+    "collision_filtering": benchmark_collision_filtering,
+    "body_io": benchmark_body_io,
+    "activation": benchmark_activation,
+    "episodes": benchmark_episodes,
+    "generations": benchmark_generations,
+    "imports": benchmark_imports
+}
+
+
+def get_commit():
+    """
+    :return: hash of the checked out commit, or None outside of a git repository
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPOSITORY_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names):
+    """
+    :param names: names of the benchmarks to run, in order
+    :return: dict with the environment and the results of each benchmark
+    """
+    results = {}
+    for name in names:
+        results[name] = BENCHMARKS[name]()
+        for metric, value in results[name].items():
+            print("{} {}: {:.6g}".format(name, metric, value))
+
+    return {"commit": get_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pymunk": pymunk.version,
+            "numpy": np.__version__,
+            "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Jerry's simulation")
+    parser.add_argument("--output", help="path of the JSON file to write results to")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="benchmarks to run, defaults to all")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.only or list(BENCHMARKS))
+    if args.output is not None:
+        with open(args.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
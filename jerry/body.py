@@ -1,8 +1,12 @@
+import math
+from array import array
 from collections import namedtuple
 
+import pymunk
+
 from jerry.body_config import joints
 from jerry.body_config import segments
-from jerry.joint import Joint
+from jerry.joint import Joint, RATE_SCALE
 from jerry.segment import Segment
 
 # tuple to store current body angle to report to rest of simulation
@@ -123,6 +127,21 @@ class Body:
                                                                 joints["ankle"],
                                                                 joint_angles.right_ankle)
 
+        # Segments whose angles and rates make up the BodyState, and the (base, branch) indices of each joint in the
+        # same order as the joint angles in BodyState and the torques in BodyCommand
+        self.state_segments = [self.torso,
+                               self.left_upper_arm, self.left_forearm, self.right_upper_arm, self.right_forearm,
+                               self.left_thigh, self.left_calf, self.left_foot,
+                               self.right_thigh, self.right_calf, self.right_foot]
+        self.state_joint_indices = [(0, 1), (1, 2), (0, 3), (3, 4), (0, 5), (5, 6), (6, 7), (0, 8), (8, 9), (9, 10)]
+
+        # Preallocated buffers so the simulation loop can read states and write commands without allocating
+        self.state_buffer = array('d', [0.0] * len(BodyState._fields))
+        self.command_buffer = array('d', [0.0] * len(BodyCommand._fields))
+        self.state_bodies = [segment.body for segment in self.state_segments]  # pymunk bodies live as long as segments
+        self.segment_angles = array('d', [0.0] * len(self.state_segments))
+        self.segment_rates = array('d', [0.0] * len(self.state_segments))
+
     def create_segment(self, base_segment, segment_info, joint_info, starting_angle, attach_to_end=True):
         """
         Creates a new body segment attached to the given segment.
@@ -148,31 +167,21 @@ class Body:
         Draws all bodies using the supplied pygame screen. Must be draw in the correct order to ensure that they overlap
         correctly
         :param screen: pygame screen
+        :return: list of the rects covered by each segment
         """
-
-        # Left arm
-        self.left_upper_arm.draw(screen)
-        self.left_forearm.draw(screen)
-
-        # Left leg
-        self.left_calf.draw(screen)
-        self.left_foot.draw(screen)
-        self.left_thigh.draw(screen)
-
-        # Right Leg
-        self.right_calf.draw(screen)
-        self.right_foot.draw(screen)
-        self.right_thigh.draw(screen)
-
-        # Torso
-        self.torso.draw(screen)
-
-        # Head
-        self.head.draw(screen)
-
-        # Right arm
-        self.right_upper_arm.draw(screen)
-        self.right_forearm.draw(screen)
+        segments = [self.left_upper_arm, self.left_forearm,  # Left arm
+                    self.left_calf, self.left_foot, self.left_thigh,  # Left leg
+                    self.right_calf, self.right_foot, self.right_thigh,  # Right Leg
+                    self.torso,
+                    self.head,
+                    self.right_upper_arm, self.right_forearm]  # Right arm
+
+        rects = []
+        for segment in segments:
+            rect = segment.draw(screen)
+            if rect is not None:
+                rects.append(rect)
+        return rects
 
     def add_to_space(self, space):
         """
@@ -211,6 +220,69 @@ class Body:
         self.right_knee.add_to_space(space)
         self.right_ankle.add_to_space(space)
 
+    def remove_from_space(self, space):
+        """
+        Removes all bodies, shapes, and constraints from the given pymunk space
+        :param space: pymunk space
+        """
+        for joint in self.get_joints():
+            joint.remove_from_space(space)
+        for segment in self.get_segments():
+            segment.remove_from_space(space)
+
+    def save_state(self):
+        """
+        :return: list of the saved state of every segment, can be passed to restore_state
+        """
+        return [segment.save_state() for segment in self.get_segments()]
+
+    def restore_state(self, state):
+        """
+        Puts this body back into a saved state. Joints get new constraints without cached impulses or motor rates.
+        Must not be called while the body is in a space
+        :param state: list returned by save_state
+        """
+        for segment, segment_state in zip(self.get_segments(), state):
+            segment.restore_state(segment_state)
+        for joint in self.get_joints():
+            joint.create_constraints()
+
+    def get_segments(self):
+        """
+        :return: list of every Segment in this body
+        """
+        return [self.torso, self.head,
+                self.left_upper_arm, self.left_forearm, self.right_upper_arm, self.right_forearm,
+                self.left_thigh, self.left_calf, self.left_foot,
+                self.right_thigh, self.right_calf, self.right_foot]
+
+    def get_joints(self):
+        """
+        :return: list of every Joint in this body
+        """
+        return [self.neck,
+                self.left_shoulder, self.left_elbow, self.right_shoulder, self.right_elbow,
+                self.left_hip, self.left_knee, self.left_ankle,
+                self.right_hip, self.right_knee, self.right_ankle]
+
+    def set_shape_filter(self, shape_filter):
+        """
+        Sets the collision filter of every segment's shape
+        :param shape_filter: pymunk ShapeFilter
+        """
+        for segment in self.get_segments():
+            segment.shape.filter = shape_filter
+
+    def freeze(self):
+        """
+        Stops every segment where it is and makes it kinematic, so the body stays in its space without being moved by
+        gravity, its joints, or the ground. The body can't be simulated again afterwards
+        """
+        for segment in self.get_segments():
+            segment.body.body_type = pymunk.Body.KINEMATIC
+            segment.body.velocity = (0, 0)
+            segment.body.angular_velocity = 0
+
     def get_state(self):
         """
         Returns a BodyState containing all relevant state info
@@ -241,6 +313,49 @@ class Body:
 
         return state
 
+    def read_state(self):
+        """
+        Writes all relevant state info into state_buffer, in the same order as the fields of BodyState. Gives the same
+        values as get_state, but reads each segment's angle and rate only once instead of once per joint, into
+        preallocated arrays so no lists are built on every step
+        :return: state_buffer
+        """
+        state_bodies = self.state_bodies
+        angles = self.segment_angles
+        rates = self.segment_rates
+        for index in range(len(state_bodies)):
+            segment_body = state_bodies[index]
+            angles[index] = segment_body.angle
+            rates[index] = segment_body.angular_velocity
+
+        buffer = self.state_buffer
+        buffer[0] = angles[0]  # Torso
+        buffer[1] = rates[0]
+        for index in range(len(self.state_joint_indices)):
+            base, branch = self.state_joint_indices[index]
+            buffer[2 + index] = angles[base] - angles[branch] + math.pi  # same as Joint.get_angle
+            buffer[12 + index] = (rates[base] - rates[branch]) / RATE_SCALE  # same as Joint.get_rate
+        return buffer
+
+    def apply_command(self, command=None):
+        """
+        Sets joint torques from a sequence in the same order as the fields of BodyCommand
+        :param command: torques to apply, defaults to command_buffer
+        """
+        if command is None:
+            command = self.command_buffer
+
+        self.left_shoulder.set_torque(command[0])
+        self.left_elbow.set_torque(command[1])
+        self.right_shoulder.set_torque(command[2])
+        self.right_elbow.set_torque(command[3])
+        self.left_hip.set_torque(command[4])
+        self.left_knee.set_torque(command[5])
+        self.left_ankle.set_torque(command[6])
+        self.right_hip.set_torque(command[7])
+        self.right_knee.set_torque(command[8])
+        self.right_ankle.set_torque(command[9])
+
     def set_rates(self, command):
         """
         Takes a BodyCommand object and sets the corresponding rates
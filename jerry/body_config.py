@@ -1,8 +1,7 @@
+import os
 from collections import namedtuple
 from math import pi
 
-import pygame
-
 # Size and Weight Constants
 TOTAL_MASS = 20  # Made up units
 TOTAL_HEIGHT = 350  # Pygame pixels
@@ -67,6 +66,13 @@ collision_types = {
     "ground": 3
 }
 
+# Collision Filter Categories #
+# Body segments only collide with the ground, never with each other or with another body sharing the same space
+collision_categories = {
+    "body": 0b01,
+    "ground": 0b10
+}
+
 body_collision_types = {
     "torso": collision_types["upper"],
     "head": collision_types["upper"],
@@ -77,15 +83,16 @@ body_collision_types = {
     "foot": collision_types["lower"]
 }
 
-# Images
+# Images, only loaded once a segment is drawn
+image_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "images")
 images = {
-    "torso": pygame.image.load("images/torso.bmp"),
-    "head": pygame.image.load("images/head.bmp"),
-    "upper_arm": pygame.image.load("images/upper_arm.bmp"),
-    "forearm": pygame.image.load("images/forearm.bmp"),
-    "thigh": pygame.image.load("images/thigh.bmp"),
-    "calf": pygame.image.load("images/leg.bmp"),
-    "foot": pygame.image.load("images/foot.bmp")
+    "torso": os.path.join(image_dir, "torso.bmp"),
+    "head": os.path.join(image_dir, "head.bmp"),
+    "upper_arm": os.path.join(image_dir, "upper_arm.bmp"),
+    "forearm": os.path.join(image_dir, "forearm.bmp"),
+    "thigh": os.path.join(image_dir, "thigh.bmp"),
+    "calf": os.path.join(image_dir, "leg.bmp"),
+    "foot": os.path.join(image_dir, "foot.bmp")
 }
 
 SegmentInfo = namedtuple('SegmentInfo', 'mass length start_speed collision_type image')
@@ -11,3 +11,14 @@ class MotionCalculator:
         """
         pass
 
+    def calculate_into(self, body_state, command):
+        """
+        Calculates the desired body commands and writes them into a preallocated buffer. Override this to avoid
+        building a BodyCommand on every step
+        :param body_state: sequence of floats in the same order as the fields of BodyState
+        :param command: mutable sequence that receives the torques, in the same order as the fields of BodyCommand
+        """
+        outputs = self.calculate(body_state)
+        for index in range(len(outputs)):
+            command[index] = outputs[index]
+
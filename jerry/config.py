@@ -1,4 +1,76 @@
+import copy
+
+from jerry import termination
+from jerry.network import CompiledNetwork
+from jerry.physics import PhysicsProfile, physics_profiles
+
+
 class Config:
+    name = None  # short name used to select this simulation, i.e. from a remote worker
+    physics_profile = "default"  # name of the physics.PhysicsProfile this simulation runs with, or a PhysicsProfile
+    time_limit = None  # seconds of simulated time after which headless runs end, None lets the terminator decide
+    # optional screening.ScreeningSchedule, if set each generation is screened with cheap runs and only the best
+    # genomes are evaluated again with this Config's own settings
+    screening = None
+
+    def get_physics_profile(self):
+        """
+        Returns the PhysicsProfile that sets the space's solver settings, the physics timestep, and the number of
+        physics steps per control step. Set physics_profile to tune them, i.e. to
+        physics_profiles["default"]._replace(substeps=2)
+        """
+        if isinstance(self.physics_profile, PhysicsProfile):
+            return self.physics_profile
+        return physics_profiles[self.physics_profile]
+
+    def get_settings(self):
+        """
+        Returns a JSON serializable dict of the settings that can differ between instances of this Config, every field
+        of the physics profile and the time limit, see apply_settings
+        """
+        return {"physics_profile": dict(self.get_physics_profile()._asdict()), "time_limit": self.time_limit}
+
+    def apply_settings(self, settings):
+        """
+        Sets the physics profile and time limit from a dict returned by get_settings
+        """
+        self.physics_profile = PhysicsProfile(**settings["physics_profile"])
+        self.time_limit = settings["time_limit"]
+
+    def get_early_stop_rules(self):
+        """
+        Returns new termination.EarlyStopRules for one headless run, rendered runs are always shown in full
+        """
+        return []
+
+    def get_run_terminator(self):
+        """
+        Returns a new StepTerminator for one headless run, with this simulation's time limit and early stop rules
+        """
+        return termination.StepTerminator(self.get_physics_profile().period, self.time_limit,
+                                          self.get_early_stop_rules())
+
+    def get_screening_config(self):
+        """
+        Returns a copy of this Config that runs the cheap evaluations of the screening schedule, or None if there is
+        no schedule
+        """
+        if self.screening is None:
+            return None
+
+        screening_config = copy.copy(self)
+        screening_config.physics_profile = self.screening.physics_profile
+        screening_config.time_limit = self.screening.time_limit
+        screening_config.screening = None
+        return screening_config
+
+    def get_network(self, genome, neat_config):
+        """
+        Returns the network that controls Jerry, compiled to straight-line Python. Can be passed to
+        get_motion_calculator in place of a neat FeedForwardNetwork
+        """
+        return CompiledNetwork.create(genome, neat_config)
+
     def get_motion_calculator(self, network):
         """
         Returns the motion calculator given a NEAT network
@@ -0,0 +1,321 @@
+"""
+Spreads the evaluation of a generation over worker processes on other machines. The coordinator runs inside the
+training process and hands out pickled genomes over TCP, each worker runs headless simulations and sends back fitness
+scores. Every genome is sent with the name of its simulation Config and the settings it's evaluated with, its physics
+profile and time limit, everything else comes from the worker's own copy of the code. Pickles are trusted blindly,
+so the coordinator only listens on localhost unless told otherwise, and should only ever be opened up to a private
+network.
+
+Start workers with:
+    python -m jerry.distributed worker --host <coordinator address> --port 5555
+and the coordinator with:
+    python -m jerry.distributed coordinator --host 0.0.0.0 --port 5555 --simulation walking
+Check that everything works with several worker processes on this machine with:
+    python -m jerry.distributed check --workers 3
+"""
+import argparse
+import multiprocessing
+import pickle
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+import traceback
+
+from jerry import evaluation
+from jerry.simulations import simulation_configs
+
+DEFAULT_PORT = 5555
+TASK_TIMEOUT = 120  # seconds a worker has to return a fitness score before its genome is given to another worker
+POLL_INTERVAL = 1  # seconds between checks for shutdown while waiting on a queue or connection
+
+HEADER = struct.Struct("!I")  # length prefix of every message
+
+
+def send_message(connection, message):
+    """
+    Pickles a message and sends it with a length prefix
+    :param connection: connected socket
+    :param message: any picklable object
+    """
+    payload = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    connection.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def receive_message(connection):
+    """
+    Blocks until a full message has arrived
+    :param connection: connected socket
+    :return: unpickled message
+    """
+    size, = HEADER.unpack(receive_exactly(connection, HEADER.size))
+    return pickle.loads(receive_exactly(connection, size))
+
+
+def receive_exactly(connection, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise EOFError("Connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+class WorkerStats:
+    """
+    Throughput of a single remote worker
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.connected_time = time.time()
+        self.evaluations = 0
+        self.busy_time = 0
+        self.alive = True
+
+    def genomes_per_second(self):
+        return self.evaluations / self.busy_time if self.busy_time > 0 else 0
+
+    def __str__(self):
+        description = "Worker {}:{}: {} genomes, {:.2f} genomes/s".format(self.address[0],
+                                                                         self.address[1],
+                                                                         self.evaluations,
+                                                                         self.genomes_per_second())
+        return description if self.alive else description + " (lost)"
+
+
+class Coordinator:
+    """
+    Accepts worker connections and distributes genomes between them. Genomes are re-queued if a worker dies or times
+    out, so a generation finishes as long as at least one worker is connected.
+    """
+
+    def __init__(self, port=DEFAULT_PORT, host="localhost", timeout=TASK_TIMEOUT):
+        """
+        :param port: port that workers connect to, 0 picks a free one, see self.port
+        :param host: interface to listen on, only this machine by default
+        :param timeout: seconds a worker has to return a result, and seconds evaluate waits without any connected
+        worker before giving up
+        """
+        self.timeout = timeout
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.worker_stats = []
+        self.running = True
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.server.settimeout(POLL_INTERVAL)
+        self.port = self.server.getsockname()[1]
+
+        threading.Thread(target=self.accept_workers, daemon=True).start()
+
+    def accept_workers(self):
+        while self.running:
+            try:
+                connection, address = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            stats = WorkerStats(address)
+            self.worker_stats.append(stats)
+            threading.Thread(target=self.serve_worker, args=(connection, stats), daemon=True).start()
+
+    def serve_worker(self, connection, stats):
+        """
+        Sends tasks to a single worker one at a time until it disconnects or the coordinator closes
+        """
+        connection.settimeout(self.timeout)
+        with connection:
+            while self.running:
+                try:
+                    task = self.tasks.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+
+                start = time.time()
+                try:
+                    send_message(connection, task)
+                    genome_id, fitness, error = receive_message(connection)
+                except (OSError, EOFError, pickle.UnpicklingError, struct.error) as e:
+                    print("Lost {}, re-queuing genome {}: {!r}".format(stats, task[0], e))
+                    self.tasks.put(task)
+                    break
+
+                stats.busy_time += time.time() - start
+                stats.evaluations += 1
+                self.results.put((genome_id, fitness, error))
+
+        stats.alive = False
+
+    def evaluate(self, genomes, simulation_config):
+        """
+        Evaluates genomes on the connected workers, blocks until every genome has a fitness score
+        :param genomes: list of (genome_id, genome) tuples
+        :param simulation_config: simulation Config whose name and settings the workers evaluate with
+        :return: list of (genome, fitness) tuples in the same order as genomes
+        :raises RuntimeError: if a worker fails to evaluate a genome, or no worker has been connected for timeout
+        seconds
+        """
+        settings = simulation_config.get_settings()
+        for genome_id, genome in genomes:
+            self.tasks.put((genome_id, simulation_config.name, settings, genome))
+
+        genome_ids = {genome_id for genome_id, genome in genomes}
+        fitnesses = {}
+        last_alive = time.time()
+        while len(fitnesses) < len(genomes):
+            try:
+                genome_id, fitness, error = self.results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if any(stats.alive for stats in self.worker_stats):
+                    last_alive = time.time()
+                elif time.time() - last_alive > self.timeout:
+                    self.clear_tasks()
+                    raise RuntimeError("No workers connected for {:.0f} seconds".format(self.timeout))
+                continue
+
+            if genome_id not in genome_ids:
+                continue  # left over from an evaluation that failed
+            if error is not None:
+                self.clear_tasks()
+                raise RuntimeError("Evaluating genome {} failed on a worker:\n{}".format(genome_id, error))
+            fitnesses[genome_id] = fitness
+
+        return [(genome, fitnesses[genome_id]) for genome_id, genome in genomes]
+
+    def clear_tasks(self):
+        """
+        Drops every genome that hasn't been sent to a worker yet
+        """
+        try:
+            while True:
+                self.tasks.get_nowait()
+        except queue.Empty:
+            pass
+
+    def report(self):
+        """
+        :return: list of strings describing the throughput of every worker seen so far
+        """
+        return [str(stats) for stats in self.worker_stats]
+
+    def close(self):
+        self.running = False
+        self.server.close()
+
+
+def run_worker(host, port):
+    """
+    Connects to a coordinator and evaluates genomes until the coordinator disconnects. Genomes that can't be evaluated
+    are reported back instead of taking the worker down, otherwise a bad genome would be re-queued until it had killed
+    every worker
+    :param host: address of the coordinator
+    :param port: port of the coordinator
+    """
+    configs = {}
+    try:
+        with socket.create_connection((host, port)) as connection:
+            while True:
+                genome_id, simulation_name, settings, genome = receive_message(connection)
+                try:
+                    if simulation_name not in configs:
+                        simulation_config = simulation_configs[simulation_name]()
+                        configs[simulation_name] = simulation_config, simulation_config.get_neat_config()
+                    simulation_config, neat_config = configs[simulation_name]
+                    simulation_config.apply_settings(settings)
+                    result = genome_id, evaluation.evaluate_genome(genome, neat_config, simulation_config), None
+                except Exception:
+                    result = genome_id, None, traceback.format_exc()
+                send_message(connection, result)
+    except EOFError:
+        return
+    except (OSError, pickle.UnpicklingError, struct.error) as e:
+        print("Lost the coordinator at {}:{}: {!r}".format(host, port, e))
+
+
+def check(num_workers, simulation_name, count):
+    """
+    Evaluates the same genomes on several worker processes on this machine and in this process, then again after one
+    of the workers is stopped, and compares the scores
+    :param num_workers: number of worker processes, at least two so one can be stopped
+    :param simulation_name: name of the simulation Config
+    :param count: number of random genomes
+    :return: True if every remote score matched the local one
+    """
+    from jerry.validate_profiles import create_genomes
+
+    simulation_config = simulation_configs[simulation_name]()
+    neat_config = simulation_config.get_neat_config()
+    genomes = list(enumerate(create_genomes(neat_config, count)))
+    expected = [evaluation.evaluate_genome(genome, neat_config, simulation_config) for genome_id, genome in genomes]
+
+    coordinator = Coordinator(port=0)
+    workers = [multiprocessing.Process(target=run_worker, args=("localhost", coordinator.port), daemon=True)
+               for _ in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    matched = True
+    try:
+        for attempt in ("all workers", "one worker stopped"):
+            if attempt == "one worker stopped":
+                workers[0].terminate()
+                workers[0].join()
+            results = coordinator.evaluate(genomes, simulation_config)
+            mismatches = sum(fitness != expected_fitness
+                             for (genome, fitness), expected_fitness in zip(results, expected))
+            print("{}: {} of {} scores differ from local evaluation".format(attempt, mismatches, len(genomes)))
+            for line in coordinator.report():
+                print(line)
+            matched = matched and mismatches == 0
+    finally:
+        coordinator.close()
+        for worker in workers:
+            worker.terminate()
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed evaluation of Jerry's genomes")
+    subparsers = parser.add_subparsers(dest="mode")
+    subparsers.required = True
+
+    worker_parser = subparsers.add_parser("worker", help="evaluate genomes sent by a coordinator")
+    worker_parser.add_argument("--host", default="localhost")
+    worker_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    coordinator_parser = subparsers.add_parser("coordinator", help="train, evaluating genomes on remote workers")
+    coordinator_parser.add_argument("--host", default="localhost",
+                                    help="interface to listen on, i.e. 0.0.0.0 for workers on a private network")
+    coordinator_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator_parser.add_argument("--simulation", choices=sorted(simulation_configs), default="backflip")
+    coordinator_parser.add_argument("--timeout", type=float, default=TASK_TIMEOUT)
+
+    check_parser = subparsers.add_parser("check", help="compare scores from local worker processes with local ones")
+    check_parser.add_argument("--workers", type=int, default=3)
+    check_parser.add_argument("--simulation", choices=sorted(simulation_configs), default="walking")
+    check_parser.add_argument("--count", type=int, default=40, help="number of random genomes")
+
+    args = parser.parse_args()
+    if args.mode == "worker":
+        run_worker(args.host, args.port)
+    elif args.mode == "check":
+        if args.workers < 2:
+            parser.error("--workers must be at least 2")
+        return 0 if check(args.workers, args.simulation, args.count) else 1
+    else:
+        from jerry import train
+        train.simulation_config = simulation_configs[args.simulation]()
+        train.coordinator = Coordinator(args.port, args.host, args.timeout)
+        train.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+from functools import partial
+from multiprocessing import Pool
+
+from jerry import physics, profiling, termination, trajectory
+from jerry.network import BatchNetwork
+
+# each worker process keeps its own copy of the configs so only genomes and fitness scores cross process boundaries
+worker_neat_config = None
+worker_simulation_config = None
+worker_screening_config = None  # copy of the simulation Config used to screen genomes, see Config.screening
+worker_vectorize = False
+worker_trajectory_dir = None
+worker_profiler = None  # profiling.Profiler whose measurements are sent back with each result
+
+# SimulationContext for each type of simulation Config, physics profile, and time limit, built on first use in each
+# process
+contexts = {}
+
+
+def get_context(simulation_config):
+    """
+    :return: this process's SimulationContext for the given simulation
+    """
+    key = (type(simulation_config), simulation_config.get_physics_profile(), simulation_config.time_limit)
+    context = contexts.get(key)
+    if context is None:
+        context = physics.SimulationContext(simulation_config)
+        contexts[key] = context
+    return context
+
+
+def evaluate_genome(genome, neat_config, simulation_config, trajectory_path=None, profiler=None):
+    """
+    Runs a single headless simulation of a genome, reusing this process's body for the simulation
+    :param genome: genome to be evaluated
+    :param neat_config: NEAT config
+    :param simulation_config: Config of the simulation to run
+    :param trajectory_path: if given, the run is recorded to this .npz file so it can be replayed later
+    :param profiler: optional profiling.Profiler that times each phase of the simulation
+    :return: fitness score
+    """
+    net = simulation_config.get_network(genome, neat_config)
+    motion_calculator = simulation_config.get_motion_calculator(net)
+    fitness_calculator = simulation_config.get_fitness_calculator()
+    context = get_context(simulation_config)
+    if trajectory_path is None:
+        return context.simulate(motion_calculator, fitness_calculator, profiler=profiler)
+
+    recorder = trajectory.TrajectoryRecorder(context.body, context.physics_profile.control_period)
+    fitness = context.simulate(motion_calculator, fitness_calculator, recorder.record, profiler)
+    recorder.save(trajectory_path, simulation_config.name, fitness)
+    return fitness
+
+
+def evaluate_genomes(genomes, neat_config, simulation_config, vectorize=False, profiler=None):
+    """
+    Runs headless simulations of several genomes in lockstep inside one shared space
+    :param genomes: list of genomes to be evaluated
+    :param neat_config: NEAT config
+    :param simulation_config: Config of the simulation to run
+    :param vectorize: if True, activate every genome's network at once with NumPy instead of using the Config's
+    motion calculators, which only works for networks whose outputs are the BodyCommand
+    :param profiler: optional profiling.Profiler, batches are only timed as a whole
+    :return: list of fitness scores in the same order as genomes
+    """
+    if profiler is not None:
+        with profiler.timer("batch"):
+            fitnesses = evaluate_genomes(genomes, neat_config, simulation_config, vectorize)
+        profiler.count("episodes", len(genomes))
+        return fitnesses
+
+    bodies = [simulation_config.get_body() for _ in genomes]
+    fitness_calculators = [simulation_config.get_fitness_calculator() for _ in genomes]
+    run_terminators = [simulation_config.get_run_terminator() for _ in genomes]
+
+    if vectorize:
+        batch_network = BatchNetwork(genomes, neat_config)
+        return physics.simulate_batch(bodies, None, fitness_calculators, batch_network,
+                                      simulation_config.get_physics_profile(), run_terminators)
+
+    networks = [simulation_config.get_network(genome, neat_config) for genome in genomes]
+    motion_calculators = [simulation_config.get_motion_calculator(network) for network in networks]
+    return physics.simulate_batch(bodies, motion_calculators, fitness_calculators,
+                                  physics_profile=simulation_config.get_physics_profile(),
+                                  run_terminators=run_terminators)
+
+
+def evaluate_in_batches(genomes, neat_config, simulation_config, batch_size, vectorize=False, trajectory_dir=None,
+                        profiler=None, generation=None, screened=False):
+    """
+    Evaluates genomes batch_size at a time, each batch shares one space
+    :param genomes: list of genomes to be evaluated
+    :param vectorize: whether to activate the networks of each batch at once
+    :param trajectory_dir: if given, every run is recorded into this directory, which means genomes are simulated
+    one at a time
+    :param profiler: optional profiling.Profiler
+    :param generation: generation number, names recorded trajectories
+    :param screened: whether these are screening runs, names recorded trajectories
+    :return: generator of fitness scores in the same order as genomes
+    """
+    if batch_size <= 1 or trajectory_dir is not None:
+        for genome in genomes:
+            trajectory_path = None
+            if trajectory_dir is not None:
+                trajectory_path = trajectory.get_path(trajectory_dir, genome, generation, screened)
+            yield evaluate_genome(genome, neat_config, simulation_config, trajectory_path, profiler)
+        return
+
+    for start in range(0, len(genomes), batch_size):
+        yield from evaluate_genomes(genomes[start:start + batch_size], neat_config, simulation_config, vectorize,
+                                    profiler)
+
+
+def init_worker(neat_config, simulation_config, vectorize, trajectory_dir=None, profile=False):
+    """
+    Stores the configs for every evaluation this worker process will run
+    """
+    global worker_neat_config, worker_simulation_config, worker_screening_config, worker_vectorize, \
+        worker_trajectory_dir, worker_profiler
+    worker_neat_config = neat_config
+    worker_simulation_config = simulation_config
+    worker_screening_config = simulation_config.get_screening_config()
+    worker_vectorize = vectorize
+    worker_trajectory_dir = trajectory_dir
+    worker_profiler = profiling.Profiler() if profile else None
+
+
+def get_worker_config(screening):
+    """
+    :return: the simulation Config this worker evaluates with, or its screening copy
+    """
+    return worker_screening_config if screening else worker_simulation_config
+
+
+def evaluate_in_worker(genome, screening=False, generation=None):
+    """
+    :param screening: whether to run the cheap screening evaluation instead of the full one
+    :param generation: generation number, names recorded trajectories
+    :return: (fitness score, measurements returned by take_measurements)
+    """
+    trajectory_path = None
+    if worker_trajectory_dir is not None:
+        trajectory_path = trajectory.get_path(worker_trajectory_dir, genome, generation, screening)
+    fitness = evaluate_genome(genome, worker_neat_config, get_worker_config(screening), trajectory_path,
+                              worker_profiler)
+    return fitness, take_measurements()
+
+
+def evaluate_batch_in_worker(genomes, screening=False):
+    """
+    :param screening: whether to run the cheap screening evaluation instead of the full one
+    :return: (list of fitness scores, measurements returned by take_measurements)
+    """
+    fitnesses = evaluate_genomes(genomes, worker_neat_config, get_worker_config(screening), worker_vectorize,
+                                 worker_profiler)
+    return fitnesses, take_measurements()
+
+
+def take_measurements():
+    """
+    :return: (profiler measurements or None if not profiling, early stop counts) collected by this worker since its
+    last result
+    """
+    measurements = worker_profiler.take() if worker_profiler is not None else None
+    return measurements, termination.early_stop_stats.take()
+
+
+class ParallelEvaluator:
+    """
+    Evaluates genomes in a pool of worker processes, each of which runs headless simulations
+    """
+
+    def __init__(self, num_workers, neat_config, simulation_config, batch_size=1, vectorize=False,
+                 trajectory_dir=None, profiler=None):
+        """
+        :param num_workers: number of worker processes
+        :param neat_config: NEAT config
+        :param simulation_config: Config of the simulation to run
+        :param batch_size: number of genomes each worker simulates together in one space
+        :param vectorize: whether to activate the networks of each batch at once
+        :param trajectory_dir: if given, every run is recorded into this directory and batching is turned off
+        :param profiler: optional profiling.Profiler that collects the measurements of every worker
+        """
+        self.num_workers = num_workers
+        self.batch_size = batch_size if trajectory_dir is None else 1
+        self.profiler = profiler
+        self.pool = Pool(num_workers, initializer=init_worker,
+                         initargs=(neat_config, simulation_config, vectorize, trajectory_dir, profiler is not None))
+
+    def evaluate(self, genomes, screening=False, generation=None):
+        """
+        Evaluates genomes in parallel, results are returned in the same order as the genomes
+        :param genomes: list of (genome_id, genome) tuples
+        :param screening: whether to run the simulation Config's cheap screening evaluation instead of the full one
+        :param generation: generation number, names recorded trajectories
+        :return: generator of (genome, fitness) tuples
+        """
+        population = [genome for genome_id, genome in genomes]
+        if self.batch_size > 1:
+            batches = [population[start:start + self.batch_size]
+                       for start in range(0, len(population), self.batch_size)]
+            evaluate_batch = partial(evaluate_batch_in_worker, screening=screening)
+            fitnesses = (fitness
+                         for batch_fitnesses in self.collect(self.pool.imap(evaluate_batch, batches))
+                         for fitness in batch_fitnesses)
+        else:
+            # chunksize of one keeps workers balanced, run lengths vary widely between genomes
+            evaluate = partial(evaluate_in_worker, screening=screening, generation=generation)
+            fitnesses = self.collect(self.pool.imap(evaluate, population, chunksize=1))
+        return zip(population, fitnesses)
+
+    def collect(self, results):
+        """
+        Merges the measurements that come with each result into the profiler when profiling, and the early stop
+        counts into this process's termination.early_stop_stats
+        :param results: iterable of worker results
+        :return: generator of results without measurements
+        """
+        for result, (measurements, early_stops) in results:
+            if measurements is not None:
+                self.profiler.merge(measurements)
+            termination.early_stop_stats.merge(early_stops)
+            yield result
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
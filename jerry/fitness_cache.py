@@ -0,0 +1,165 @@
+"""
+Remembers the fitness score of every genome that's been evaluated, so genomes that survive unchanged into the next
+generation, like NEAT's elites, aren't simulated again. Entries are keyed by a hash of everything that decides a
+score: the genome's nodes and connections with all of their attributes, the simulation Config, its physics profile,
+time limit, and early stop rules, and the source code that simulates and scores Jerry. Two genomes with different keys
+but the same genes share an entry.
+
+Only the modules in SCORING_MODULES and the simulation Config's own module are hashed. A cache saved to disk must be
+deleted after any other change that affects scores, like upgrading pymunk, or CACHE_VERSION bumped.
+
+Headless runs are deterministic, and a genome scores the same alone or batched with others, so a cached score is
+exactly what simulating the genome again would give. Batches aren't activated with NumPy while the cache is in use,
+NumPy doesn't round exactly like the compiled networks.
+"""
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+
+import pymunk
+
+from jerry import body, body_config, calculator, config, fitness, joint, network, physics, segment, termination
+
+CACHE_SIZE = 100000  # scores kept, least recently used are dropped first
+CACHE_VERSION = 1  # part of every key, bump it when scores change in a way the source hash can't see
+SCORING_MODULES = (body, body_config, calculator, config, fitness, joint, network, physics, segment, termination)
+
+source_hashes = {}  # simulation module name -> hash of the source that scores its runs
+
+
+def genome_key(genome):
+    """
+    :return: string that describes every gene of a genome, floats written exactly, in a fixed order
+    """
+    genes = []
+    for gene_set in (genome.nodes, genome.connections):
+        for key in sorted(gene_set):
+            gene = gene_set[key]
+            values = [getattr(gene, attribute.name) for attribute in gene._gene_attributes]
+            genes.append(repr((key, [value.hex() if isinstance(value, float) else value for value in values])))
+    return "\n".join(genes)
+
+
+def get_source_hash(simulation_config):
+    """
+    :return: hex digest of the source of SCORING_MODULES and of the module that defines the simulation Config
+    """
+    module_name = type(simulation_config).__module__
+    source_hash = source_hashes.get(module_name)
+    if source_hash is None:
+        digest = hashlib.sha256()
+        for module in SCORING_MODULES + (sys.modules[module_name],):
+            with open(module.__file__, 'rb') as handle:
+                digest.update(handle.read())
+        source_hash = digest.hexdigest()
+        source_hashes[module_name] = source_hash
+    return source_hash
+
+
+def simulation_key(simulation_config, neat_config):
+    """
+    :return: string that describes the settings and code of a simulation that affect fitness scores
+    """
+    simulation_type = type(simulation_config)
+    rules = [(type(rule).__name__, sorted(vars(rule).items())) for rule in simulation_config.get_early_stop_rules()]
+    return repr((CACHE_VERSION,
+                 get_source_hash(simulation_config),
+                 pymunk.version,
+                 "{}.{}".format(simulation_type.__module__, simulation_type.__qualname__),
+                 tuple(simulation_config.get_physics_profile()),
+                 simulation_config.time_limit,
+                 rules,
+                 neat_config.genome_config.num_inputs,
+                 neat_config.genome_config.num_outputs))
+
+
+class FitnessCache:
+    """
+    Least recently used cache of fitness scores that can be saved to a JSON file and loaded by later runs
+    """
+
+    def __init__(self, max_size=CACHE_SIZE, path=None):
+        """
+        :param max_size: number of scores kept
+        :param path: optional path of a JSON file the cache is loaded from if it exists, and written to by save
+        """
+        self.max_size = max_size
+        self.path = path
+        self.scores = OrderedDict()  # key -> fitness score, least recently used first
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def get_key(self, genome, neat_config, simulation_config):
+        """
+        :return: hex digest that identifies a genome's score in a simulation
+        """
+        digest = hashlib.sha256(simulation_key(simulation_config, neat_config).encode())
+        digest.update(genome_key(genome).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        :return: cached fitness score, or None if there is none
+        """
+        fitness = self.scores.get(key)
+        if fitness is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.scores.move_to_end(key)
+        return fitness
+
+    def put(self, key, fitness):
+        self.scores[key] = fitness
+        self.scores.move_to_end(key)
+        if len(self.scores) > self.max_size:
+            self.scores.popitem(last=False)
+
+    def evaluate(self, genomes, neat_config, simulation_config, evaluate):
+        """
+        Looks up every genome and evaluates only the ones that aren't cached
+        :param genomes: list of (genome_id, genome) tuples
+        :param neat_config: NEAT config
+        :param simulation_config: Config the genomes are evaluated with
+        :param evaluate: function called with a list of (genome_id, genome) tuples, returns an iterable of
+        (genome, fitness) tuples in the same order
+        :return: list of (genome, fitness) tuples in the same order as genomes
+        """
+        keys = [self.get_key(genome, neat_config, simulation_config) for genome_id, genome in genomes]
+        results = [(genome, self.get(key)) for (genome_id, genome), key in zip(genomes, keys)]
+        missing = [index for index, (genome, fitness) in enumerate(results) if fitness is None]
+        for index, (genome, fitness) in zip(missing, evaluate([genomes[index] for index in missing])):
+            self.put(keys[index], fitness)
+            results[index] = genome, fitness
+        return results
+
+    def take_stats(self):
+        """
+        Resets the hit and miss counts
+        :return: (hits, misses) since the last call
+        """
+        stats = self.hits, self.misses
+        self.hits = 0
+        self.misses = 0
+        return stats
+
+    def load(self):
+        with open(self.path) as handle:
+            for key, fitness in json.load(handle):
+                self.put(key, fitness)
+
+    def save(self):
+        """
+        Writes every cached score to the cache's path, least recently used first, replacing the file only once it's
+        complete
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w') as handle:
+            json.dump(list(self.scores.items()), handle)
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,128 @@
+"""
+Retained-mode drawing for the simulator window. Text is only rendered again when it changes, and after the first
+frame of a run only the regions that changed are cleared and sent to the display.
+"""
+import pygame
+
+BACKGROUND_COLOR = (255, 255, 255)
+FOREGROUND_COLOR = (0, 0, 0)
+FONT_SIZE = 36
+
+
+class TextColumn:
+    """
+    A column of text lines, each line keeps its rendered surface until its text changes
+    """
+
+    def __init__(self, font, x, y):
+        """
+        :param font: pygame Font
+        :param x: left edge of the column in pixels
+        :param y: top of the first line in pixels
+        """
+        self.font = font
+        self.x = x
+        self.y = y
+        self.texts = []
+        self.surfaces = []
+        self.rects = []
+
+    def update(self, screen, texts):
+        """
+        Renders every line whose text changed and clears the area its old text covered
+        :param screen: pygame screen
+        :param texts: list of strings, one per line
+        :return: list of rects that changed
+        """
+        changed = []
+        for index in range(max(len(texts), len(self.texts))):
+            old_text = self.texts[index] if index < len(self.texts) else None
+            new_text = texts[index] if index < len(texts) else None
+            if old_text == new_text:
+                continue
+
+            if old_text is not None:
+                screen.fill(BACKGROUND_COLOR, self.rects[index])
+                changed.append(self.rects[index])
+            if new_text is not None:
+                # an opaque background means lines can be blitted again without blending over themselves
+                surface = self.font.render(new_text, True, FOREGROUND_COLOR, BACKGROUND_COLOR)
+                rect = surface.get_rect(topleft=(self.x, self.y + index * self.font.get_height()))
+                if index < len(self.texts):
+                    self.surfaces[index] = surface
+                    self.rects[index] = rect
+                else:
+                    self.surfaces.append(surface)
+                    self.rects.append(rect)
+                changed.append(rect)
+
+        del self.surfaces[len(texts):]
+        del self.rects[len(texts):]
+        self.texts = list(texts)
+        return changed
+
+    def draw(self, screen):
+        """
+        Blits every line, lines are already rendered so this is cheap enough to do every frame
+        :param screen: pygame screen
+        """
+        for surface, rect in zip(self.surfaces, self.rects):
+            screen.blit(surface, rect)
+
+
+class Hud:
+    """
+    Draws the stats, fitness lines, and body, and keeps track of which parts of the screen they covered so the next
+    frame only has to update those
+    """
+
+    def __init__(self, screen):
+        """
+        :param screen: pygame screen, must have been created after pygame.init
+        """
+        self.screen = screen
+        font = pygame.font.Font(None, FONT_SIZE)
+        self.stats_column = TextColumn(font, 16, 8)
+        self.history_column = TextColumn(font, 300, 8)
+        self.moving_rects = []  # areas covered by the body and lines in the last frame
+        self.full_redraw = True
+
+    def invalidate(self):
+        """
+        Makes the next frame clear and update the whole screen, needed when its contents can't be trusted
+        """
+        self.full_redraw = True
+
+    def draw(self, stats, history, line_positions, body):
+        """
+        Draws one frame and updates the display
+        :param stats: list of strings for the first column
+        :param history: list of strings for the second column
+        :param line_positions: x coordinates of the vertical lines
+        :param body: Body to draw
+        """
+        screen = self.screen
+        if self.full_redraw:
+            screen.fill(BACKGROUND_COLOR)
+            # forget the old text so every line is rendered onto the cleared screen
+            self.stats_column.update(screen, [])
+            self.history_column.update(screen, [])
+
+        dirty = self.moving_rects
+        for rect in dirty:
+            screen.fill(BACKGROUND_COLOR, rect)
+
+        dirty += self.stats_column.update(screen, stats)
+        dirty += self.history_column.update(screen, history)
+        self.stats_column.draw(screen)
+        self.history_column.draw(screen)
+
+        self.moving_rects = [pygame.draw.line(screen, FOREGROUND_COLOR, (x, 0), (x, screen.get_height()))
+                             for x in line_positions]
+        self.moving_rects += body.draw(screen)
+
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            pygame.display.update(dirty + self.moving_rects)
@@ -4,6 +4,7 @@ import pymunk
 ROTARY_JOINT_MAX_TORQUE = 5000000  # The maximum torque that can be exerted to keep the joint within range
 MOTOR_MAX_TORQUE = 1500000  # The maximum torque that the muscles of this joint, lower than rotary joint max force
 MAX_SPEED = 20  # rad/s
+RATE_SCALE = 10  # joint rates are divided by this to reduce their weight in the NN
 
 
 class Joint:
@@ -21,16 +22,25 @@ class Joint:
         self.branch_body = branch_segment.body
 
         if attach_to_end:
-            segment_a_position = base_segment.shape.b
+            self.base_anchor = base_segment.shape.b
         else:
-            segment_a_position = base_segment.shape.a
+            self.base_anchor = base_segment.shape.a
+        self.branch_anchor = branch_segment.shape.a
+        self.angular_range = angular_range
+        self.max_torque = max_torque
+
+        self.create_constraints()
 
-        self.pivot = pymunk.PivotJoint(self.base_body, self.branch_body, segment_a_position, branch_segment.shape.a)
-        self.rotary_limit = pymunk.RotaryLimitJoint(self.base_body, self.branch_body, *angular_range)
+    def create_constraints(self):
+        """
+        Creates the pivot, rotary limit, and motor that make up this joint. New constraints start without any of the
+        impulses that pymunk caches between steps
+        """
+        self.pivot = pymunk.PivotJoint(self.base_body, self.branch_body, self.base_anchor, self.branch_anchor)
+        self.rotary_limit = pymunk.RotaryLimitJoint(self.base_body, self.branch_body, *self.angular_range)
         self.rotary_limit.max_force = ROTARY_JOINT_MAX_TORQUE
         self.motor = pymunk.SimpleMotor(self.base_body, self.branch_body, 0)
-        self.motor.max_force = max_torque
-        self.max_torque = max_torque
+        self.motor.max_force = self.max_torque
 
     def add_to_space(self, space):
         """
@@ -40,6 +50,13 @@ class Joint:
         """
         space.add(self.pivot, self.rotary_limit, self.motor)
 
+    def remove_from_space(self, space):
+        """
+        Removes all constraints from a pymunk Space
+        :param space: pymunk simulation Space
+        """
+        space.remove(self.pivot, self.rotary_limit, self.motor)
+
     def set_rate(self, rate):
         """
         Sets the speed of the motor controlling this joint, motor is still subject to max torque and rotary limit
@@ -63,7 +80,7 @@ class Joint:
         Returns the angular rate of change of this joint, defined as the angular velocity of body a minus that of body b
         :return: the rate at which this joint's angle is changing, in radians/second
         """
-        return (self.base_body.angular_velocity - self.branch_body.angular_velocity) / 10  # hack to reduce weight in NN
+        return (self.base_body.angular_velocity - self.branch_body.angular_velocity) / RATE_SCALE
 
     def get_angle(self):
         """
@@ -0,0 +1,172 @@
+"""
+Per-generation training metrics. MetricsReporter is a neat-python reporter that summarizes each generation once, right
+after it's evaluated, and can append every summary to a JSON lines log. MetricsServer serves the latest summary as
+plain text over HTTP so it can be scraped while training, e.g.
+    curl http://localhost:8000/metrics
+
+Unlike neat's StatisticsReporter, which keeps every fitness score and a copy of every generation's best genome,
+memory use doesn't grow with the length of a run. Only the last HISTORY_SIZE summaries are kept, older ones can be
+spilled to a binary file of float64 SPILL_FIELDS records, see read_spilled.
+"""
+import copy
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from collections import deque
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+from neat.reporting import BaseReporter
+
+METRIC_PREFIX = "jerry_"
+HISTORY_SIZE = 1000  # generation summaries kept in memory
+SPILL_FIELDS = ("generation", "fitness_max", "fitness_mean", "fitness_stdev", "species", "evaluations", "seconds",
+                "evaluations_per_second", "time")
+
+
+class MetricsReporter(BaseReporter):
+    """
+    Keeps summaries of the most recent generations and the best genome found so far
+    """
+
+    def __init__(self, log_path=None, spill_path=None, history_size=HISTORY_SIZE):
+        """
+        :param log_path: optional path of a JSON lines file that gets one line per generation, appended to if it exists
+        :param spill_path: optional path of a binary file that summaries are appended to once they're dropped from
+        memory, without one old summaries are discarded
+        :param history_size: number of generation summaries kept in memory
+        """
+        self.log_path = log_path
+        self.spill_path = spill_path
+        self.generation = None
+        self.generation_start = None
+        self.evaluation_seconds = None  # time spent evaluating the current generation, see set_evaluation_time
+        self.generations = 0  # number of generations summarized, including those no longer in memory
+        self.summaries = deque(maxlen=history_size)
+        self.best_genome = None  # copy of the fittest genome of the whole run
+        self.latest = None  # summary of the last evaluated generation
+        self.lock = threading.Lock()  # the summary is read from the metrics server's thread
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.generation_start = time.perf_counter()
+        self.evaluation_seconds = None
+
+    def set_evaluation_time(self, seconds):
+        """
+        Sets how long evaluating the current generation took, so seconds and evaluations_per_second leave out
+        everything else the fitness function does, like replaying the champion on screen. Without it the whole
+        generation is timed
+        """
+        self.evaluation_seconds = seconds
+
+    def post_evaluate(self, config, population, species, best_genome):
+        seconds = self.evaluation_seconds
+        if seconds is None:
+            seconds = time.perf_counter() - self.generation_start
+        fitnesses = [genome.fitness for genome in population.values()]
+        mean = sum(fitnesses) / len(fitnesses)
+        summary = {"generation": self.generation,
+                   "fitness_max": max(fitnesses),
+                   "fitness_mean": mean,
+                   "fitness_stdev": math.sqrt(sum((fitness - mean) ** 2 for fitness in fitnesses) / len(fitnesses)),
+                   "species": len(species.species),
+                   "evaluations": len(fitnesses),
+                   "seconds": seconds,
+                   "evaluations_per_second": len(fitnesses) / seconds if seconds > 0 else 0.0,
+                   "time": time.time()}
+
+        if self.best_genome is None or best_genome.fitness > self.best_genome.fitness:
+            self.best_genome = copy.deepcopy(best_genome)
+
+        if len(self.summaries) == self.summaries.maxlen and self.spill_path is not None:
+            self.spill(self.summaries[0])
+
+        with self.lock:
+            self.summaries.append(summary)
+            self.generations += 1
+            self.latest = summary
+
+        if self.log_path is not None:
+            self.append_to_log(summary)
+
+    def append_to_log(self, summary):
+        """
+        Appends a summary to the log as one line of JSON, the log is never rewritten
+        """
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, 'a') as handle:
+            handle.write(json.dumps(summary) + "\n")
+
+    def spill(self, summary):
+        """
+        Appends a summary that's about to be dropped from memory to the spill file
+        """
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        with open(self.spill_path, 'ab') as handle:
+            array('d', (summary[field] for field in SPILL_FIELDS)).tofile(handle)
+
+    def get_fitness_means(self, count):
+        """
+        :param count: maximum number of generations
+        :return: list of the fitness means of the last count generations, in order
+        """
+        return [summary["fitness_mean"] for summary in list(self.summaries)[-count:]]
+
+    def metrics_text(self):
+        """
+        :return: the latest summary in the Prometheus text format, one "name value" line per metric
+        """
+        with self.lock:
+            summary = self.latest
+        if summary is None:
+            return ""
+        return "".join("{}{} {}\n".format(METRIC_PREFIX, name, value) for name, value in summary.items())
+
+
+def read_spilled(path):
+    """
+    :param path: spill file written by a MetricsReporter
+    :return: float64 array with one row per spilled generation and one column per field in SPILL_FIELDS
+    """
+    return np.fromfile(path).reshape(-1, len(SPILL_FIELDS))
+
+
+class MetricsServer:
+    """
+    Serves a MetricsReporter's latest summary at /metrics from a background thread
+    """
+
+    def __init__(self, reporter, port, host="localhost"):
+        """
+        :param reporter: MetricsReporter to serve
+        :param port: port to listen on
+        :param host: address to listen on, only this machine by default
+        """
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = reporter.metrics_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes would flood the training output
+
+        self.server = HTTPServer((host, port), MetricsHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,183 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+CACHE_SIZE = 256  # number of compiled networks kept, least recently used are dropped first
+
+compiled_networks = OrderedDict()
+
+
+def get_layers(genome, config):
+    """
+    Finds the evaluation order of a genome's network the same way neat's FeedForwardNetwork does
+    :param genome: neat-python genome
+    :param config: NEAT config
+    :return: (layers, links) where layers is a list of sets of node keys and links maps each evaluated node to its list
+    of (input node, weight) tuples
+    """
+    connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+    layers = feed_forward_layers(config.genome_config.input_keys, config.genome_config.output_keys, connections)
+
+    links = {}
+    for layer in layers:
+        for node in layer:
+            links[node] = [(i, genome.connections[(i, o)].weight) for (i, o) in connections if o == node]
+
+    return layers, links
+
+
+def check_node(node_gene):
+    """
+    Compiled networks only implement neat's tanh activation and sum aggregation
+    """
+    if node_gene.activation != 'tanh' or node_gene.aggregation != 'sum':
+        raise ValueError("Node {} uses {} activation and {} aggregation, only tanh and sum can be compiled"
+                         .format(node_gene.key, node_gene.activation, node_gene.aggregation))
+
+
+class BatchNetwork:
+    """
+    The networks of a whole batch of genomes compiled into layered NumPy weight matrices, so that every genome's
+    outputs are calculated at once. Each row of the inputs and outputs belongs to one genome.
+    """
+
+    def __init__(self, genomes, config):
+        """
+        :param genomes: list of neat-python genomes
+        :param config: NEAT config
+        """
+        input_keys = config.genome_config.input_keys
+        output_keys = config.genome_config.output_keys
+        self.num_inputs = len(input_keys)
+        self.num_outputs = len(output_keys)
+
+        # inputs and outputs use the same columns in every genome, hidden nodes are appended after them
+        compiled = []
+        num_columns = self.num_inputs + self.num_outputs
+        num_layers = 0
+        for genome in genomes:
+            layers, links = get_layers(genome, config)
+            columns = {key: column for column, key in enumerate(input_keys + output_keys)}
+            for layer in layers:
+                for node in layer:
+                    if node not in columns:
+                        columns[node] = len(columns)
+            compiled.append((genome, layers, links, columns))
+            num_columns = max(num_columns, len(columns))
+            num_layers = max(num_layers, len(layers))
+
+        num_genomes = len(genomes)
+        self.weights = np.zeros((num_layers, num_genomes, num_columns, num_columns))
+        self.masks = np.zeros((num_layers, num_genomes, num_columns), dtype=bool)
+        self.biases = np.zeros((num_genomes, num_columns))
+        self.responses = np.zeros((num_genomes, num_columns))
+        self.values = np.zeros((num_genomes, num_columns))
+        self.inputs = np.zeros((num_genomes, self.num_inputs))  # preallocated input rows that callers can fill in
+
+        for row, (genome, layers, links, columns) in enumerate(compiled):
+            for layer_index, layer in enumerate(layers):
+                for node in layer:
+                    node_gene = genome.nodes[node]
+                    check_node(node_gene)
+                    column = columns[node]
+                    self.masks[layer_index, row, column] = True
+                    self.biases[row, column] = node_gene.bias
+                    self.responses[row, column] = node_gene.response
+                    for input_node, weight in links[node]:
+                        self.weights[layer_index, row, columns[input_node], column] += weight
+
+    def activate(self, inputs):
+        """
+        Activates every network in the batch
+        :param inputs: array of shape (number of genomes, number of inputs), one BodyState per row
+        :return: array of shape (number of genomes, number of outputs), one set of torque commands per row
+        """
+        values = self.values
+        values.fill(0)
+        values[:, :self.num_inputs] = inputs
+
+        for weights, mask in zip(self.weights, self.masks):
+            sums = np.einsum('ni,nij->nj', values, weights)
+            # matches neat's tanh_activation, which clamps 2.5 * z to [-60, 60]
+            activations = np.tanh(np.clip(2.5 * (self.biases + self.responses * sums), -60, 60))
+            np.copyto(values, activations, where=mask)
+
+        return values[:, self.num_inputs:self.num_inputs + self.num_outputs].copy()
+
+
+class CompiledNetwork:
+    """
+    A genome's network compiled into a generated Python function, with every node evaluated in order as straight-line
+    arithmetic on local variables. Drop-in replacement for neat's FeedForwardNetwork that gives identical outputs.
+    """
+
+    def __init__(self, source):
+        """
+        :param source: Python source of the activate(inputs) and activate_into(inputs, outputs) functions
+        """
+        self.source = source
+        namespace = {"tanh": math.tanh}
+        exec(source, namespace)
+        self.activate = namespace["activate"]
+        self.activate_into = namespace["activate_into"]
+
+    @staticmethod
+    def create(genome, config):
+        """
+        Compiles a genome's network, or returns the cached network if the same network has been compiled before.
+        Networks are cached by their source, genome keys aren't unique across populations or loaded genomes
+        :param genome: neat-python genome
+        :param config: NEAT config
+        :return: CompiledNetwork
+        """
+        source = generate_source(genome, config)
+        network = compiled_networks.get(source)
+        if network is not None:
+            compiled_networks.move_to_end(source)
+            return network
+
+        network = CompiledNetwork(source)
+        compiled_networks[source] = network
+        if len(compiled_networks) > CACHE_SIZE:
+            compiled_networks.popitem(last=False)
+        return network
+
+
+def generate_source(genome, config):
+    """
+    Writes the activate functions of a genome's network
+    :param genome: neat-python genome
+    :param config: NEAT config
+    :return: source code of activate(inputs), which returns a list of outputs, and activate_into(inputs, outputs),
+    which writes them into a preallocated buffer
+    """
+    input_keys = config.genome_config.input_keys
+    output_keys = config.genome_config.output_keys
+    layers, links = get_layers(genome, config)
+
+    def variable(key):
+        return "i{}".format(-key) if key < 0 else "n{}".format(key)
+
+    lines = ["    {}, = inputs".format(", ".join(variable(key) for key in input_keys))]
+
+    evaluated = set()
+    for layer in layers:
+        for node in sorted(layer):
+            node_gene = genome.nodes[node]
+            check_node(node_gene)
+            # summed in connection order, exactly like neat's sum_aggregation
+            terms = ["{} * {!r}".format(variable(i), w) for i, w in links[node]]
+            total = "({})".format(" + ".join(terms)) if terms else "0"
+            # matches neat's tanh_activation, which clamps 2.5 * z to [-60, 60]
+            lines.append("    {} = tanh(max(-60.0, min(60.0, 2.5 * ({!r} + {!r} * {}))))".format(
+                variable(node), node_gene.bias, node_gene.response, total))
+            evaluated.add(node)
+
+    # outputs that aren't connected to anything stay at zero
+    outputs = [variable(key) if key in evaluated else "0.0" for key in output_keys]
+    body = "\n".join(lines)
+    stores = "\n".join("    outputs[{}] = {}".format(index, output) for index, output in enumerate(outputs))
+    return ("def activate(inputs):\n{}\n    return [{}]\n\n"
+            "def activate_into(inputs, outputs):\n{}\n{}\n").format(body, ", ".join(outputs), body, stores)
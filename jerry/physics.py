@@ -0,0 +1,337 @@
+import time
+from collections import namedtuple
+
+import pymunk
+
+from jerry import termination
+from jerry.body_config import collision_categories, collision_types
+
+FRAME_RATE = 40
+PERIOD = 1.0 / FRAME_RATE
+GROUND_START = -300
+GROUND_END = 1500  # right edge of the screen
+
+
+class PhysicsProfile(namedtuple('PhysicsProfile', 'period substeps iterations collision_slop collision_bias')):
+    """
+    How accurately, and so how slowly, a simulation is run. Each control step reads the body's state, activates the
+    network, and applies the command, which is then held for substeps physics steps of period seconds each. The rest
+    are pymunk Space settings: solver iterations per step, the overlap allowed between shapes, and the fraction of
+    overlap left uncorrected after one second
+    """
+    __slots__ = ()
+
+    @property
+    def control_period(self):
+        """
+        :return: seconds of simulated time between control steps
+        """
+        return self.period * self.substeps
+
+    @property
+    def control_rate(self):
+        """
+        :return: control steps per second of simulated time
+        """
+        return 1.0 / self.control_period
+
+
+# pymunk's own settings, read from a new space because pymunk stores some of them at single precision
+pymunk_defaults = pymunk.Space()
+PYMUNK_ITERATIONS = pymunk_defaults.iterations
+PYMUNK_COLLISION_SLOP = pymunk_defaults.collision_slop
+PYMUNK_COLLISION_BIAS = pymunk_defaults.collision_bias  # corrects 10% of overlap every 1/60 of a second
+del pymunk_defaults
+
+# every simulation Config picks one of these by name, default is what pymunk does out of the box
+physics_profiles = {
+    "fast-train": PhysicsProfile(period=PERIOD, substeps=1, iterations=5, collision_slop=0.5,
+                                 collision_bias=PYMUNK_COLLISION_BIAS),
+    "default": PhysicsProfile(period=PERIOD, substeps=1, iterations=PYMUNK_ITERATIONS,
+                              collision_slop=PYMUNK_COLLISION_SLOP, collision_bias=PYMUNK_COLLISION_BIAS),
+    "reference": PhysicsProfile(period=PERIOD / 4, substeps=4, iterations=30, collision_slop=0.05,
+                                collision_bias=PYMUNK_COLLISION_BIAS)
+}
+DEFAULT_PROFILE = physics_profiles["default"]
+
+
+def add_ground(space):
+    """
+    Adds a ground line to the specified space object
+    :param space: pymunk space
+    """
+    segment = pymunk.Segment(space.static_body, (GROUND_START, 0), (GROUND_END, 0), 5)
+    segment.friction = .9
+    segment.collision_type = collision_types["ground"]
+    segment.filter = pymunk.ShapeFilter(categories=collision_categories["ground"])
+    space.add(segment)
+
+
+def set_collision_handlers(space, fall_callback):
+    """
+    If upper body touches ground, end the simulation. Body segments never collide with each other, that's handled by
+    their shape filters so those pairs never reach Python
+    :param space: pymunk space
+    :param fall_callback: function to be called with the upper body shape that touched the ground when a fall is
+    detected
+    """
+
+    def fall(arbiter, y, z):
+        fall_callback(arbiter.shapes[0])
+        return True
+
+    space.add_collision_handler(collision_types["upper"], collision_types["ground"]).begin = fall
+
+
+def create_space(fall_callback, physics_profile=DEFAULT_PROFILE):
+    """
+    Creates a pymunk space to hold a new simulation, adds default changes
+    :param fall_callback: callback that's called with the fallen shape when the space detects a fall
+    :param physics_profile: PhysicsProfile whose solver settings the space uses
+    :return: space with collision handlers and ground
+    """
+    space = pymunk.Space()
+    space.gravity = (0.0, -900.0)
+    space.iterations = physics_profile.iterations
+    space.collision_slop = physics_profile.collision_slop
+    space.collision_bias = physics_profile.collision_bias
+    set_collision_handlers(space, fall_callback)
+    add_ground(space)
+    return space
+
+
+def simulate(body, motion_calculator, fitness_calculator, run_terminator=None, frame_callback=None, profiler=None,
+             physics_profile=DEFAULT_PROFILE):
+    """
+    Runs a full simulation as fast as the CPU allows. Nothing is drawn unless a frame_callback is supplied
+    :param body: Body object that will be simulated
+    :param motion_calculator: MotionCalculator that determines Jerry's motion
+    :param fitness_calculator: Determines Jerry's fitness score
+    :param run_terminator: RunTerminator that ends the run, defaults to one that counts physics steps
+    :param frame_callback: optional function called with the fitness calculator before each control step's physics
+    :param profiler: optional profiling.Profiler that times each phase of every step
+    :param physics_profile: PhysicsProfile of the space and of the physics and control steps
+    :return: fitness score
+    """
+    if run_terminator is None:
+        run_terminator = termination.StepTerminator(physics_profile.period)
+
+    def fall_callback(shape):
+        run_terminator.fall()
+
+    space = create_space(fall_callback, physics_profile)
+
+    body.add_to_space(space)
+
+    return run(space, body, motion_calculator, fitness_calculator, run_terminator, frame_callback, profiler,
+               physics_profile)
+
+
+def run(space, body, motion_calculator, fitness_calculator, run_terminator, frame_callback=None, profiler=None,
+        physics_profile=DEFAULT_PROFILE):
+    """
+    Steps a space that already contains the body until the run terminator ends the run. The space's fall callback
+    must notify run_terminator
+    :param space: pymunk space containing the body
+    :param profiler: optional profiling.Profiler, runs without one don't pay for any timing
+    :param physics_profile: PhysicsProfile the space was created with, run_terminator must count steps of its period
+    :return: fitness score
+    """
+    if profiler is not None:
+        return run_profiled(space, body, motion_calculator, fitness_calculator, run_terminator, frame_callback,
+                            profiler, physics_profile)
+
+    period, substeps = physics_profile.period, physics_profile.substeps
+    while not run_terminator.run_complete():
+        if not run_terminator.has_fallen():
+            fitness_calculator.update(body)
+
+        run_terminator.update(body)
+
+        motion_calculator.calculate_into(body.read_state(), body.command_buffer)
+        body.apply_command()
+
+        if frame_callback is not None:
+            frame_callback(fitness_calculator)
+
+        for _ in range(substeps):
+            space.step(period)
+            run_terminator.step()
+
+    return fitness_calculator.get_fitness()
+
+
+def run_profiled(space, body, motion_calculator, fitness_calculator, run_terminator, frame_callback, profiler,
+                 physics_profile):
+    """
+    Same as run, but adds the duration of each phase of every control step to the profiler
+    :return: fitness score
+    """
+    period, substeps = physics_profile.period, physics_profile.substeps
+    clock = time.perf_counter
+    fitness_times = profiler.get_samples("fitness")
+    termination_times = profiler.get_samples("termination")
+    state_times = profiler.get_samples("state")
+    network_times = profiler.get_samples("network")
+    command_times = profiler.get_samples("command")
+    frame_times = profiler.get_samples("frame")
+    physics_times = profiler.get_samples("physics")
+    steps = 0
+
+    while not run_terminator.run_complete():
+        start = clock()
+        if not run_terminator.has_fallen():
+            fitness_calculator.update(body)
+        fitness_end = clock()
+        run_terminator.update(body)
+        termination_end = clock()
+        body_state = body.read_state()
+        state_end = clock()
+        motion_calculator.calculate_into(body_state, body.command_buffer)
+        network_end = clock()
+        body.apply_command()
+        command_end = clock()
+
+        if frame_callback is not None:
+            frame_callback(fitness_calculator)
+        frame_end = clock()
+
+        for _ in range(substeps):
+            space.step(period)
+            run_terminator.step()
+        physics_end = clock()
+
+        fitness_times.append(fitness_end - start)
+        termination_times.append(termination_end - fitness_end)
+        state_times.append(state_end - termination_end)
+        network_times.append(network_end - state_end)
+        command_times.append(command_end - network_end)
+        if frame_callback is not None:
+            frame_times.append(frame_end - command_end)
+        physics_times.append(physics_end - frame_end)
+        steps += 1
+
+    profiler.count("steps", steps * substeps)
+    profiler.count("control_steps", steps)
+    profiler.count("episodes")
+    return fitness_calculator.get_fitness()
+
+
+class SimulationContext:
+    """
+    A body that is built once and reset to its starting state before every run, which is much cheaper than building a
+    new Body for each genome. Each run still gets a new space, pymunk numbers shapes as they're added to a space and
+    that numbering decides the order contacts are solved in, so reusing a space would change trajectories
+    """
+
+    def __init__(self, simulation_config):
+        """
+        :param simulation_config: Config that builds the body and chooses the physics profile
+        """
+        self.body = simulation_config.get_body()
+        self.physics_profile = simulation_config.get_physics_profile()
+        self.get_run_terminator = simulation_config.get_run_terminator
+        self.initial_state = self.body.save_state()
+        self.run_terminator = None
+        self.space = None
+
+    def fall(self, shape):
+        self.run_terminator.fall()
+
+    def reset(self):
+        """
+        Restores the body's starting pose, velocities, and joints in a new space, and starts a new run terminator
+        """
+        if self.space is not None:
+            self.body.remove_from_space(self.space)
+
+        self.body.restore_state(self.initial_state)
+        self.space = create_space(self.fall, self.physics_profile)
+        self.body.add_to_space(self.space)
+        self.run_terminator = self.get_run_terminator()
+
+    def simulate(self, motion_calculator, fitness_calculator, frame_callback=None, profiler=None):
+        """
+        Runs a full headless simulation starting from the initial state
+        :param motion_calculator: MotionCalculator that determines Jerry's motion
+        :param fitness_calculator: Determines Jerry's fitness score
+        :param frame_callback: optional function called with the fitness calculator before every control step's
+        physics
+        :param profiler: optional profiling.Profiler that times each phase of every step
+        :return: fitness score
+        """
+        self.reset()
+        return run(self.space, self.body, motion_calculator, fitness_calculator, self.run_terminator, frame_callback,
+                   profiler, self.physics_profile)
+
+
+def simulate_batch(bodies, motion_calculators, fitness_calculators, batch_network=None,
+                   physics_profile=DEFAULT_PROFILE, run_terminators=None):
+    """
+    Runs several headless simulations in lockstep inside a single space, so each space.step moves every body at
+    once. Segment shape filters keep bodies from colliding with each other, and each one is terminated on its own.
+    Finished bodies are frozen but stay in the space until the whole batch ends, removing them would reorder the
+    space's bodies and constraints and change the scores of the bodies still running
+    :param bodies: list of Body objects that will be simulated
+    :param motion_calculators: MotionCalculator for each body, unused if there is a batch_network
+    :param fitness_calculators: fitness calculator for each body
+    :param batch_network: optional network.BatchNetwork that calculates the commands of every body in one call
+    :param physics_profile: PhysicsProfile of the space and of the physics and control steps
+    :param run_terminators: optional StepTerminator for each body, counting steps of the profile's period
+    :return: list of fitness scores in the same order as bodies
+    """
+    period, substeps = physics_profile.period, physics_profile.substeps
+    if run_terminators is None:
+        run_terminators = [termination.StepTerminator(period) for _ in bodies]
+    owners = {}  # maps each shape to the index of the body it belongs to
+
+    def fall_callback(shape):
+        run_terminators[owners[shape]].fall()
+
+    space = create_space(fall_callback, physics_profile)
+
+    for index, body in enumerate(bodies):
+        body.add_to_space(space)
+        for segment in body.get_segments():
+            owners[segment.shape] = index
+
+    fitnesses = [None] * len(bodies)
+    running = list(range(len(bodies)))
+    while running:
+        still_running = []
+        for index in running:
+            body = bodies[index]
+            run_terminator = run_terminators[index]
+            fitness_calculator = fitness_calculators[index]
+
+            if run_terminator.run_complete():
+                fitnesses[index] = fitness_calculator.get_fitness()
+                body.freeze()
+                continue
+
+            if not run_terminator.has_fallen():
+                fitness_calculator.update(body)
+
+            run_terminator.update(body)
+
+            if batch_network is None:
+                motion_calculators[index].calculate_into(body.read_state(), body.command_buffer)
+                body.apply_command()
+            else:
+                batch_network.inputs[index] = body.read_state()
+            still_running.append(index)
+
+        if batch_network is not None and still_running:
+            # finished bodies keep their last state, their commands are ignored
+            commands = batch_network.activate(batch_network.inputs).tolist()
+            for index in still_running:
+                bodies[index].apply_command(commands[index])
+
+        for _ in range(substeps if still_running else 0):
+            space.step(period)
+            for index in still_running:
+                run_terminators[index].step()
+
+        running = still_running
+
+    return fitnesses
@@ -0,0 +1,172 @@
+"""
+Opt-in timing of every phase of a simulation step, used to find out where evaluation time goes. Durations are kept
+per phase until the end of a generation, then summarized as percentiles and exported as JSON and CSV.
+
+Phases timed by physics.run:
+    fitness: fitness_calculator.update
+    termination: run_terminator.update
+    state: body.read_state
+    network: motion_calculator.calculate_into
+    command: body.apply_command
+    frame: the frame callback, Simulator also times its events, draw, and record parts, the rest is spent waiting on
+        the frame rate
+    physics: space.step
+Batched simulations are only timed as a whole, under batch.
+"""
+import csv
+import json
+import os
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+SUMMARY_FIELDS = ["count", "total", "mean"] + ["p{}".format(percentile) for percentile in PERCENTILES] + ["max"]
+
+
+class Profiler:
+    """
+    Collects phase durations in seconds and counters such as steps, episodes, and genomes
+    """
+
+    def __init__(self):
+        self.samples = {}  # phase name -> array of durations
+        self.counters = Counter()
+        self.history = []  # summary of each finished generation
+
+    def get_samples(self, phase):
+        """
+        :return: the array that durations of a phase are appended to, hot loops keep it to skip the lookup
+        """
+        samples = self.samples.get(phase)
+        if samples is None:
+            samples = array('d')
+            self.samples[phase] = samples
+        return samples
+
+    def add(self, phase, seconds):
+        self.get_samples(phase).append(seconds)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def timer(self, phase):
+        """
+        :return: context manager that adds the time spent inside it to a phase
+        """
+        return PhaseTimer(self.get_samples(phase))
+
+    def take(self):
+        """
+        Removes everything collected so far, used by worker processes to send their measurements back
+        :return: (samples, counters) that can be passed to merge
+        """
+        taken = self.samples, self.counters
+        self.samples = {}
+        self.counters = Counter()
+        return taken
+
+    def merge(self, taken):
+        """
+        Adds measurements returned by another Profiler's take
+        """
+        samples, counters = taken
+        for phase, durations in samples.items():
+            self.get_samples(phase).extend(durations)
+        self.counters.update(counters)
+
+    def summarize(self, generation):
+        """
+        Summarizes and clears everything collected during a generation
+        :param generation: generation number
+        :return: dict with the generation, its counters, and count, total, mean, percentiles, and max of each phase in
+        milliseconds
+        """
+        samples, counters = self.take()
+        phases = {}
+        for phase, durations in sorted(samples.items()):
+            if not durations:
+                continue
+            milliseconds = np.frombuffer(durations) * 1000
+            values = [len(durations), milliseconds.sum(), milliseconds.mean()]
+            values += np.percentile(milliseconds, PERCENTILES).tolist() + [milliseconds.max()]
+            phases[phase] = {field: float(value) for field, value in zip(SUMMARY_FIELDS, values)}
+            phases[phase]["count"] = len(durations)
+
+        summary = {"generation": generation, "counters": dict(counters), "phases": phases}
+        self.history.append(summary)
+        return summary
+
+    def export(self, folder):
+        """
+        Writes every generation's summary to profile.json and profile.csv in folder, overwriting earlier exports. The
+        CSV has a row per phase and generation, counters are rows with only a count
+        :param folder: directory to write to, created if needed
+        """
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "profile.json"), 'w') as handle:
+            json.dump(self.history, handle, indent=2)
+
+        with open(os.path.join(folder, "profile.csv"), 'w', newline='') as handle:
+            writer = csv.writer(handle)
+            writer.writerow(["generation", "phase"] + SUMMARY_FIELDS)
+            for summary in self.history:
+                for phase, values in summary["phases"].items():
+                    writer.writerow([summary["generation"], phase] + [values[field] for field in SUMMARY_FIELDS])
+                for name, value in sorted(summary["counters"].items()):
+                    writer.writerow([summary["generation"], name, value])
+
+
+class PhaseTimer:
+    """
+    Context manager that appends its duration to an array of samples
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class NullTimer:
+    """
+    Stands in for a PhaseTimer when nothing is being profiled
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+def timer(profiler, phase):
+    """
+    :param profiler: Profiler or None
+    :param phase: name of the phase
+    :return: the profiler's timer for phase, or one that does nothing if profiler is None
+    """
+    return NULL_TIMER if profiler is None else profiler.timer(phase)
+
+
+def format_summary(summary):
+    """
+    :param summary: dict returned by Profiler.summarize
+    :return: list of strings, one line per counter and phase
+    """
+    lines = ["{}: {}".format(name, value) for name, value in sorted(summary["counters"].items())]
+    for phase, values in summary["phases"].items():
+        lines.append("{}: {} samples, {:.0f} ms total, p50 {:.4f} ms, p90 {:.4f} ms, p99 {:.4f} ms".format(
+            phase, values["count"], values["total"], values["p50"], values["p90"], values["p99"]))
+    return lines
@@ -1,3 +1,4 @@
+import json
 import os
 import pickle
 from datetime import datetime
@@ -6,11 +7,13 @@ record_dir = "records/"
 folder_path = os.path.join(record_dir, datetime.today().strftime("%B_%d_%Y_%I_%M%p"))
 
 
-def save_genome(genome, score, generation):
+def save_genome(genome, score, generation, metadata=None):
     """ Pickle the and save it into the run's folder using generation and score as labels
     :param genome: neat-python genome to be stored
     :param score: fitness score
     :param generation: generation number
+    :param metadata: optional dict describing how the genome was evaluated, written next to the pickle as JSON with
+    the exact score added, see get_metadata_path
     """
     filename = "gen_{}_score_{:.0f}.pickle".format(generation, score)
     file_path = os.path.join(folder_path, filename)
@@ -18,6 +21,18 @@ def save_genome(genome, score, generation):
     with open(file_path, 'wb') as handle:
         pickle.dump(genome, handle)
 
+    if metadata is not None:
+        metadata = dict(metadata, generation=generation, fitness=score, fitness_hex=float(score).hex())
+        with open(get_metadata_path(file_path), 'w') as handle:
+            json.dump(metadata, handle, indent=2)
+
+
+def get_metadata_path(genome_path):
+    """
+    :return: path of the JSON file saved alongside a pickled genome
+    """
+    return os.path.splitext(genome_path)[0] + ".json"
+
 
 def create_folder():
     """ Creates a new folder named after the start time """
@@ -0,0 +1,111 @@
+"""
+Records rendered simulations without stalling the simulation loop. Frames are copied into a bounded queue and written
+by a background thread, either piped into ffmpeg to make one video per episode, or saved as numbered images if ffmpeg
+isn't installed.
+"""
+import os
+import queue
+import shutil
+import subprocess
+import threading
+
+import pygame
+
+QUEUE_SIZE = 120  # frames waiting to be written, add_frame blocks once this many are queued
+VIDEO_FORMAT = "mp4"
+IMAGE_FORMAT = "jpg"  # used for each frame when ffmpeg isn't available
+
+
+class FrameRecorder:
+    """
+    Writes the frames of each episode on a background thread. One episode is written at a time, starting a new episode
+    waits for the previous one to finish
+    """
+
+    def __init__(self, frame_rate, queue_size=QUEUE_SIZE, ffmpeg=None):
+        """
+        :param frame_rate: frames per second of the encoded videos
+        :param queue_size: maximum number of frames waiting to be written
+        :param ffmpeg: path of the ffmpeg executable, found on the PATH if None
+        """
+        self.frame_rate = frame_rate
+        self.queue_size = queue_size
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        self.frames = None
+        self.writer = None
+
+    def start_episode(self, path, size, frame_rate=None):
+        """
+        Starts recording a new episode
+        :param path: path of the episode without an extension, parent directories are created if needed
+        :param size: (width, height) of every frame
+        :param frame_rate: frames per second of this episode's video, defaults to the recorder's frame rate
+        :return: path of the video, or of the directory of images if ffmpeg isn't available
+        """
+        self.finish_episode()
+        frame_rate = frame_rate or self.frame_rate
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self.ffmpeg is not None:
+            output = "{}.{}".format(path, VIDEO_FORMAT)
+            target = self.encode_video
+        else:
+            output = path
+            os.makedirs(output, exist_ok=True)
+            target = self.save_images
+
+        self.frames = queue.Queue(self.queue_size)
+        self.writer = threading.Thread(target=target, args=(self.frames, output, size, frame_rate), daemon=True)
+        self.writer.start()
+        return output
+
+    def add_frame(self, surface):
+        """
+        Copies a frame into the queue, blocks while the queue is full instead of dropping frames
+        :param surface: pygame Surface with the size given to start_episode
+        """
+        self.frames.put(pygame.image.tostring(surface, "RGB"))
+
+    def finish_episode(self):
+        """
+        Waits until every frame of the current episode has been written
+        """
+        if self.writer is None:
+            return
+
+        self.frames.put(None)
+        self.writer.join()
+        self.frames = None
+        self.writer = None
+
+    def encode_video(self, frames, output, size, frame_rate):
+        """
+        Pipes raw frames into ffmpeg until the end of the episode
+        """
+        width, height = size
+        command = [self.ffmpeg, "-loglevel", "error", "-y",
+                   "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", "{}x{}".format(width, height),
+                   "-r", str(frame_rate), "-i", "-",
+                   "-pix_fmt", "yuv420p", output]
+        encoder = subprocess.Popen(command, stdin=subprocess.PIPE)
+        try:
+            for frame in iter(frames.get, None):
+                try:
+                    encoder.stdin.write(frame)
+                except BrokenPipeError:
+                    pass  # ffmpeg has already reported its error, keep draining so add_frame never blocks forever
+        finally:
+            try:
+                encoder.stdin.close()
+            except BrokenPipeError:
+                pass
+            encoder.wait()
+
+    @staticmethod
+    def save_images(frames, output, size, frame_rate):
+        """
+        Saves every frame as a numbered image until the end of the episode
+        """
+        for number, frame in enumerate(iter(frames.get, None)):
+            image = pygame.image.fromstring(frame, size, "RGB")
+            pygame.image.save(image, os.path.join(output, "{:05d}.{}".format(number, IMAGE_FORMAT)))
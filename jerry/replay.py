@@ -0,0 +1,93 @@
+"""
+Watches runs that were recorded with jerry.trajectory, drawn with the same sprites as live simulations. Run from the
+repository root with:
+    python -m jerry.replay records/<run>/trajectories/gen_3/genome_12_full.npz --speed 2
+Add --output <path> to encode the replay with the frame recorder instead of only showing it.
+"""
+import argparse
+import os
+import sys
+
+import pygame
+
+from jerry import trajectory
+from jerry.hud import Hud
+from jerry.recorder import FrameRecorder
+from jerry.simulations import simulation_configs
+from jerry.simulator import SCREEN_HEIGHT, SCREEN_WIDTH
+
+
+def set_pose(body, pose):
+    """
+    Moves every segment to a recorded pose, the body is never simulated so only position and angle matter
+    :param body: Body built by the recorded simulation's Config
+    :param pose: array of (x, y, angle) for every segment in the order of Body.get_segments
+    """
+    for segment, (x, y, angle) in zip(body.get_segments(), pose.tolist()):
+        segment.body.position = x, y
+        segment.body.angle = angle
+
+
+def replay(path, speed=1.0, output=None):
+    """
+    Shows a recorded run
+    :param path: path of the .npz file
+    :param speed: playback speed, 1 is real time, can be fractional
+    :param output: if given, path of a recording of the replay, without an extension
+    """
+    recorded = trajectory.load(path)
+    body = simulation_configs[recorded["simulation"]]().get_body()
+    poses = recorded["poses"]
+    fitnesses = recorded["fitnesses"]
+
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.init()
+    pygame.display.set_caption("Jerry Learns - {}".format(os.path.basename(path)))
+    hud = Hud(screen)
+    clock = pygame.time.Clock()
+
+    recorder = None
+    if output is not None:
+        recorder = FrameRecorder(1 / recorded["period"])
+        recorder.start_episode(output, screen.get_size())
+
+    position = 0.0
+    while position < len(poses):
+        step = int(position)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                position = len(poses)
+            elif event.type == pygame.VIDEOEXPOSE:
+                hud.invalidate()
+
+        set_pose(body, poses[step])
+        fitness = float(fitnesses[step])
+        stats = ["Simulation: {}".format(recorded["simulation"]),
+                 "Step: {}/{}".format(step + 1, len(poses)),
+                 "Time: {:.2f}s".format(step * recorded["period"]),
+                 "Fitness: {:.0f}".format(fitness)]
+        hud.draw(stats, ["Final Fitness: {:.0f}".format(recorded["fitness"])], (fitness,), body)
+
+        if recorder is not None:
+            recorder.add_frame(screen)
+        clock.tick(1 / recorded["period"])  # each recorded step is shown for as long as it was simulated
+        position += speed
+
+    if recorder is not None:
+        recorder.finish_episode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded run of Jerry")
+    parser.add_argument("path", help=".npz file saved by jerry.trajectory")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed, 1 is real time")
+    parser.add_argument("--output", help="also record the replay to this path, without an extension")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    replay(args.path, args.speed, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
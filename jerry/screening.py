@@ -0,0 +1,67 @@
+"""
+Multi-fidelity evaluation of a generation. Every genome is screened first with a cheap run, using a coarser physics
+profile and/or a shorter episode, and only the best fraction of them is evaluated again with the simulation's full
+settings. Most offspring are clearly worse than their parents, so most of a generation only pays for the cheap run.
+
+Screening fitness scores aren't comparable to full ones, a short episode scores less and a coarse profile can score
+more. Genomes that don't make the cut keep their screening score, lowered if needed so none of them outranks a genome
+that was evaluated at full fidelity.
+"""
+import math
+from collections import namedtuple
+
+
+class ScreeningSchedule(namedtuple('ScreeningSchedule', 'physics_profile time_limit fraction start_generation')):
+    """
+    How a simulation Config screens its generations
+        physics_profile: name of the physics.PhysicsProfile used for screening, i.e. "fast-train", or a PhysicsProfile
+        time_limit: seconds of simulated time screening runs are cut to, None runs them until the terminator ends them
+        fraction: share of each generation that's evaluated again at full fidelity
+        start_generation: first generation that's screened, earlier ones are evaluated at full fidelity only
+    """
+    __slots__ = ()
+
+    def applies_to(self, generation):
+        """
+        :param generation: generation number, starting at 1
+        :return: whether the generation is screened
+        """
+        return generation >= self.start_generation
+
+    def promoted_count(self, population_size):
+        """
+        :return: number of genomes of a population that are evaluated again at full fidelity, at least one
+        """
+        return min(population_size, max(1, math.ceil(population_size * self.fraction)))
+
+
+# namedtuple's defaults argument needs Python 3.7
+ScreeningSchedule.__new__.__defaults__ = (None, 0.25, 1)
+
+
+def screen(genomes, schedule, evaluate):
+    """
+    Screens a generation and evaluates its best genomes again at full fidelity
+    :param genomes: list of (genome_id, genome) tuples
+    :param schedule: ScreeningSchedule
+    :param evaluate: function called with a list of (genome_id, genome) tuples and a screened keyword argument that
+    says whether to run the cheap evaluation, returns an iterable of (genome, fitness) tuples in the same order
+    :return: (list of (genome, fitness) tuples in the same order as genomes, set of the indices of the genomes that
+    were evaluated again at full fidelity)
+    """
+    results = list(evaluate(genomes, screened=True))
+    if not results:
+        return results, set()
+
+    ranked = sorted(range(len(results)), key=lambda index: results[index][1], reverse=True)
+    promoted_indices = sorted(ranked[:schedule.promoted_count(len(results))])  # in population order
+    for index, result in zip(promoted_indices, evaluate([genomes[index] for index in promoted_indices],
+                                                        screened=False)):
+        results[index] = result
+
+    promoted = set(promoted_indices)
+    floor = min(results[index][1] for index in promoted)
+    for index, (genome, fitness) in enumerate(results):
+        if index not in promoted and fitness > floor:
+            results[index] = genome, floor
+    return results, promoted
@@ -1,16 +1,15 @@
 import math
 
-import pygame.transform
 import pymunk
-import pymunk.pygame_util
 from pymunk import Vec2d
 
+from jerry.body_config import collision_categories
 from jerry.conversion import to_pygame
 
 SEGMENT_WIDTH = 5
 FRICTION = .9
 
-IMAGE_SIZE_RATIO = 1.15
+SHAPE_FILTER = pymunk.ShapeFilter(categories=collision_categories["body"], mask=collision_categories["ground"])
 
 """
 Class that represents one segment of the human body, i.e. upper arm, thigh.
@@ -37,14 +36,10 @@ class Segment:
         self.body.velocity = segment_info.start_speed
         self.shape = pymunk.Segment(self.body, (0, length / 2), (0, -length / 2), SEGMENT_WIDTH)
         self.shape.collision_type = segment_info.collision_type
+        self.shape.filter = SHAPE_FILTER
         self.shape.friction = FRICTION
 
-        image = segment_info.image
-        if image is not None:
-            ratio = length / image.get_height() * IMAGE_SIZE_RATIO
-            new_width = int(image.get_width() * ratio)
-            image = pygame.transform.scale(image, (new_width, int(length * IMAGE_SIZE_RATIO)))
-        self.image = image
+        self.image_path = segment_info.image
 
     def get_rate(self):
         """
@@ -74,6 +69,23 @@ class Segment:
         """
         return self.shape.body.position + self.shape.b.rotated(self.body.angle)
 
+    def save_state(self):
+        """
+        :return: tuple of the position, angle, and velocities needed to put this segment back where it is now
+        """
+        return self.body.position, self.body.angle, self.body.velocity, self.body.angular_velocity
+
+    def restore_state(self, state):
+        """
+        Moves this segment back to a state returned by save_state
+        :param state: saved state tuple
+        """
+        # a zero length position update clears the bias velocities that chipmunk carries over from the last step
+        pymunk.Body.update_position(self.body, 0)
+        self.body.position, self.body.angle, self.body.velocity, self.body.angular_velocity = state
+        self.body.force = 0, 0
+        self.body.torque = 0
+
     def add_to_space(self, space):
         """
         Adds all pymunk objects to a space
@@ -82,25 +94,33 @@ class Segment:
         """
         space.add(self.body, self.shape)
 
+    def remove_from_space(self, space):
+        """
+        Removes all pymunk objects from a space
+        :param space: pymunk space
+        """
+        space.remove(self.body, self.shape)
+
     def draw(self, screen):
         """
         Draws this object on a pygame screen
         :param screen: pygame screen
-        :return: nothing
+        :return: the rect covered by this segment, or None if nothing was drawn
         """
-        if self.image is None:
+        if self.image_path is None:
             # todo get this working again after pymunk update
             # pymunk.pygame_util.DrawOptions(screen, self.shape)
-            pass
+            return None
         else:
+            # imported here so the simulation core never loads pygame unless something is drawn
+            from jerry import sprites
+
             p = self.body.position
             p = Vec2d(to_pygame(p))
 
-            # divide by two because it works
-            angle_degrees = math.degrees(self.body.angle)
-            rotated_logo_img = pygame.transform.rotate(self.image, angle_degrees)
+            rotated_logo_img = sprites.get_rotated_image(self.image_path, self.length, self.body.angle)
 
             offset = Vec2d(rotated_logo_img.get_size()) / 2.
             p -= offset
 
-            screen.blit(rotated_logo_img, p)
+            return screen.blit(rotated_logo_img, p)
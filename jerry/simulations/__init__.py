@@ -0,0 +1,7 @@
+from jerry.simulations import backflip, walking
+
+# every simulation Config by name, so configs can be chosen from the command line or stored alongside results
+simulation_configs = {
+    walking.WalkingConfig.name: walking.WalkingConfig,
+    backflip.BackflipConfig.name: backflip.BackflipConfig
+}
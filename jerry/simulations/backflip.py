@@ -5,6 +5,7 @@ import neat
 from ..calculator import MotionCalculator
 from ..config import Config
 from ..fitness import FitnessCalculator
+from .. import termination
 from ..body import BodyCommand
 from math import pi
 import jerry.body as body
@@ -93,6 +94,8 @@ class BackflipFitnessCalculator(FitnessCalculator):
 
 
 class BackflipConfig(Config):
+    name = "backflip"
+
     def get_motion_calculator(self, network):
         return NeatBackflipMotionCalculator(network)
 
@@ -109,3 +112,7 @@ class BackflipConfig(Config):
 
     def get_body(self):
         return body.Body(joint_angles)
+
+    def get_early_stop_rules(self):
+        # only rules that can't change the score, termination.RotationStall would end slow flips early
+        return [termination.FallStop()]
@@ -9,6 +9,7 @@ from ..body import BodyCommand
 from ..calculator import MotionCalculator
 from ..config import Config
 from ..fitness import FitnessCalculator
+from .. import termination
 
 joint_angles = body.JointAngles(neck=pi,
                                 left_shoulder=-pi / 4,
@@ -44,6 +45,17 @@ class NeatWalkingMotionCalculator(MotionCalculator):
         command = BodyCommand(*outputs)
         return command
 
+    def calculate_into(self, body_state, command):
+        """
+        Writes commands for the current state straight into a buffer when the network supports it
+        :param body_state: sequence of BodyState values
+        :param command: buffer that receives the BodyCommand values
+        """
+        if hasattr(self.network, "activate_into"):
+            self.network.activate_into(body_state, command)
+        else:
+            super().calculate_into(body_state, command)
+
 
 class WalkingFitnessCalculator(FitnessCalculator):
     def __init__(self):
@@ -93,6 +105,8 @@ class WalkingFitnessCalculator(FitnessCalculator):
 
 
 class WalkingConfig(Config):
+    name = "walking"
+
     def get_motion_calculator(self, network):
         return NeatWalkingMotionCalculator(network)
 
@@ -109,3 +123,7 @@ class WalkingConfig(Config):
 
     def get_body(self):
         return body.Body(joint_angles)
+
+    def get_early_stop_rules(self):
+        # only rules that can't change the score, termination.TiltStop would cut off Jerry's recoveries
+        return [termination.FallStop()]
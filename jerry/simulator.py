@@ -1,149 +1,107 @@
+import os
 import sys
 
 import pygame
-import pymunk
 
-from jerry import termination
-from jerry.body_config import collision_types
+# physics used to live in this module, add_ground, create_space, and set_collision_handlers are still importable here
+from jerry.physics import (DEFAULT_PROFILE, FRAME_RATE, PERIOD, add_ground, create_space, set_collision_handlers,
+                           simulate)
+from jerry import profiling, record, sprites
+from jerry.hud import Hud
+from jerry.recorder import FrameRecorder
 
 SCREEN_WIDTH = 1500
 SCREEN_HEIGHT = 600
-FRAME_RATE = 40
-PERIOD = 1.0 / FRAME_RATE
-
-
-def add_ground(space):
-    """
-    Adds a ground line to the specified space object
-    :param space: pymunk space
-    """
-    segment = pymunk.Segment(space.static_body, (-300, 0), (SCREEN_WIDTH, 0), 5)
-    segment.friction = .9
-    segment.collision_type = collision_types["ground"]
-    space.add(segment)
-
-
-def set_collision_handlers(space, fall_callback):
-    """
-    Upper and lower body don't collide with themselves or with each other.
-    If upper body touches ground, end the simulation
-    :param space: pymunk space
-    :param fall_callback: function to be called a fall is detected
-    """
-
-    def dont_collide(x, y, z):
-        return False
-
-    def fall(x, y, z):
-        fall_callback()
-        return True
-
-    space.add_collision_handler(collision_types["upper"], collision_types["upper"]).begin = dont_collide
-    space.add_collision_handler(collision_types["lower"], collision_types["upper"]).begin = dont_collide
-    space.add_collision_handler(collision_types["lower"], collision_types["lower"]).begin = dont_collide
-    space.add_collision_handler(collision_types["upper"], collision_types["ground"]).begin = fall
-
-
-def create_space(fall_callback):
-    """
-    Creates a pymunk space to hold a new simulation, adds default changes
-    :param fall_callback: callback that's called when the space detects a fall
-    :return: space with collision handlers and ground
-    """
-    space = pymunk.Space()
-    space.gravity = (0.0, -900.0)
-    set_collision_handlers(space, fall_callback)
-    add_ground(space)
-    return space
 
 
 class Simulator:
-    def __init__(self, population_stats, record_genomes=False, record_frames=False):
+    def __init__(self, population_stats, record_genomes=False, record_frames=False, profiler=None):
         """
         :param record_genomes: whether or not to store each pickled genome each time one beats the previous max
+        :param record_frames: whether or not to record a video of every rendered simulation in the run's folder
+        :param profiler: optional profiling.Profiler that times every simulation, including drawing
         """
 
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.screen = None
+        self.hud = None
         self.record_genomes = record_genomes
 
         self.population_stats = population_stats
         self.record_frames = record_frames
+        self.recorder = FrameRecorder(FRAME_RATE) if record_frames else None
+        self.profiler = profiler
 
+    def init_display(self):
+        """
+        Opens the pygame window, only done once the first rendered simulation starts
+        """
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.init()
         pygame.display.set_caption("Jerry Learns")
+        sprites.clear()  # sprites converted for another display would blit slowly
+        self.hud = Hud(self.screen)
 
-    def draw_stats(self):
-        """
-        Draws all stats on the screen
+    def close(self):
         """
-        font = pygame.font.Font(None, 36)
-        offset = 8
-        for text in self.population_stats.stats_list():
-            surface = font.render(text, 1, (0, 0, 0))
-            self.screen.blit(surface, (16, offset))
-            offset += font.get_height()
-
-        offset = 8
-        for stat in self.population_stats.generation_history():
-            surface = font.render(stat, 1, (0, 0, 0))
-            self.screen.blit(surface, (300, offset))
-            offset += font.get_height()
-
-    def draw_vertical_line(self, x_pos):
+        Waits for any recording that's still being written
         """
-        Draws a vertical line at the specified position
-        :param x_pos: the x coordinate of this line
-        """
-        pygame.draw.line(self.screen, (0, 0, 0), (x_pos, 0), (x_pos, SCREEN_HEIGHT))
+        if self.recorder is not None:
+            self.recorder.finish_episode()
 
-    def evaluate(self, body, motion_calculator, fitness_calculator):
+    def evaluate(self, body, motion_calculator, fitness_calculator, render=True, recording_name=None,
+                 physics_profile=DEFAULT_PROFILE):
         """
         Runs a full simulation using the given Calculator to control Jerry
         :param body: Body object that will be simulated
         :param motion_calculator: MotionCalculator that determines Jerry's motion
         :param fitness_calculator: Determines Jerry's fitness score
+        :param render: if False, skip the display and clock entirely and simulate as fast as possible
+        :param recording_name: path of the recording inside the run's folder when recording frames, e.g.
+        genome_12/gen_3, defaults to one named after the current generation and individual
+        :param physics_profile: physics.PhysicsProfile of the simulation, a frame is drawn every control step
         :return: fitness score
         """
-        clock = pygame.time.Clock()
-
-        run_terminator = termination.RunTerminator()
-
-        def fall_callback():
-            run_terminator.fall()
-
-        space = create_space(fall_callback)
+        if not render:
+            return simulate(body, motion_calculator, fitness_calculator, profiler=self.profiler,
+                            physics_profile=physics_profile)
 
-        body.add_to_space(space)
+        if self.screen is None:
+            self.init_display()
 
-        frame = 0
-
-        while not run_terminator.run_complete():
-            self.screen.fill(pygame.Color("white"))
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    sys.exit()
-
-            if not run_terminator.has_fallen():
-                fitness_calculator.update(body)
-
-            run_terminator.update(body)
-
-            inputs = body.get_state()
-            outputs = motion_calculator.calculate(inputs)
-            body.set_rates(outputs)
-
-            self.draw_stats()
-            self.draw_vertical_line(self.population_stats.max_fitness)
-            self.draw_vertical_line(fitness_calculator.get_fitness())
-            body.draw(self.screen)
-
-            if self.record_frames:
-                pygame.image.save(self.screen, "records/{}.jpg".format(frame))
-                frame += 1
-
-            space.step(PERIOD)
-            pygame.display.flip()
-            clock.tick(FRAME_RATE)
-
-        return fitness_calculator.get_fitness()
+        clock = pygame.time.Clock()
+        self.hud.invalidate()
+
+        if self.recorder is not None:
+            if recording_name is None:
+                recording_name = "gen_{}_individual_{}".format(self.population_stats.generation,
+                                                              self.population_stats.individual_number)
+            self.recorder.start_episode(os.path.join(record.folder_path, recording_name), self.screen.get_size(),
+                                        physics_profile.control_rate)
+
+        def draw_frame(current_fitness_calculator):
+            with profiling.timer(self.profiler, "events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.close()
+                        sys.exit()
+                    elif event.type == pygame.VIDEOEXPOSE:
+                        self.hud.invalidate()
+
+            with profiling.timer(self.profiler, "draw"):
+                self.hud.draw(self.population_stats.stats_list(),
+                              self.population_stats.generation_history(),
+                              (self.population_stats.max_fitness, current_fitness_calculator.get_fitness()),
+                              body)
+
+            if self.recorder is not None:
+                with profiling.timer(self.profiler, "record"):
+                    self.recorder.add_frame(self.screen)
+
+            clock.tick(physics_profile.control_rate)
+
+        fitness = simulate(body, motion_calculator, fitness_calculator, frame_callback=draw_frame,
+                           profiler=self.profiler, physics_profile=physics_profile)
+        if self.recorder is not None:
+            # the next episode waits for this one anyway, this way each video is complete once evaluate returns
+            self.recorder.finish_episode()
+        return fitness
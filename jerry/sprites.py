@@ -0,0 +1,69 @@
+"""
+Loads, scales, and rotates the sprites used to draw Jerry. Segments only import this module once they're drawn, so
+simulations without a display never load pygame or any images.
+
+Each sprite is scaled once per segment length and converted to the display's pixel format, then rotated copies are
+kept in a bounded cache keyed by angle rounded to ANGLE_RESOLUTION, so most frames only cost blits.
+"""
+import math
+from collections import OrderedDict
+
+import pygame
+
+IMAGE_SIZE_RATIO = 1.15
+ANGLE_RESOLUTION = 2  # degrees, rotated sprites are reused for every angle that rounds to the same step
+ROTATION_CACHE_SIZE = 2048  # number of rotated sprites kept, least recently used are dropped first
+
+atlas = {}  # (path, segment length) -> scaled and converted image
+rotated_images = OrderedDict()  # (path, segment length, angle step) -> rotated image
+
+
+def get_segment_image(path, length):
+    """
+    Loads a sprite and scales it to fit a segment, each sprite is only loaded and scaled once for every segment length
+    :param path: path of the image file
+    :param length: length of the segment in pixels
+    :return: pygame Surface
+    """
+    key = (path, length)
+    image = atlas.get(key)
+    if image is None:
+        image = pygame.image.load(path)
+        ratio = length / image.get_height() * IMAGE_SIZE_RATIO
+        new_width = int(image.get_width() * ratio)
+        image = pygame.transform.scale(image, (new_width, int(length * IMAGE_SIZE_RATIO)))
+        if pygame.display.get_surface() is not None:
+            # blits are much faster once the image matches the display's pixel format
+            image = image.convert_alpha()
+        atlas[key] = image
+    return image
+
+
+def get_rotated_image(path, length, angle):
+    """
+    :param path: path of the image file
+    :param length: length of the segment in pixels
+    :param angle: segment angle in radians
+    :return: pygame Surface of the scaled sprite rotated to the segment's angle, rounded to ANGLE_RESOLUTION
+    """
+    step = round(math.degrees(angle) / ANGLE_RESOLUTION) % (360 // ANGLE_RESOLUTION)
+    key = (path, length, step)
+    image = rotated_images.get(key)
+    if image is not None:
+        rotated_images.move_to_end(key)
+        return image
+
+    image = pygame.transform.rotate(get_segment_image(path, length), step * ANGLE_RESOLUTION)
+    rotated_images[key] = image
+    if len(rotated_images) > ROTATION_CACHE_SIZE:
+        rotated_images.popitem(last=False)
+    return image
+
+
+def clear():
+    """
+    Drops every cached sprite, they're rebuilt on the next draw. Needed if the display mode changes after sprites were
+    converted
+    """
+    atlas.clear()
+    rotated_images.clear()
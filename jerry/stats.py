@@ -1,40 +1,60 @@
-from neat import statistics
+from jerry.metrics import MetricsReporter
+
+HISTORY_LENGTH = 5  # number of generations shown by generation_history
 
 
 class PopulationStats:
     """
-    Class that contains all of the persisted statistics during an entire population simulation
+    Class that contains all of the persisted statistics during an entire population simulation. The strings shown on
+    screen are cached and only formatted again when a value changes, so drawing them costs the same every frame no
+    matter how long the run has been going
     """
 
-    def __init__(self):
+    def __init__(self, metrics_log_path=None):
+        """
+        :param metrics_log_path: optional path of a JSON lines file that every generation's metrics are appended to
+        """
         self.generation = 1
         self.individual_number = 1
         self.max_fitness = 0
         self.last_fitness = 0
-        self.reporter = statistics.StatisticsReporter()
+        self.reporter = MetricsReporter(metrics_log_path)
+        self.stats_key = None
+        self.stats = None
+        self.history_length = None
+        self.history = None
 
     def stats_list(self):
         """
         :return: a list of strings, each of which is a statistic to be printed
         """
-        return ["Generation: {}".format(self.generation),
-                "Individual: {}".format(self.individual_number),
-                "Max Fitness: {:.0f}".format(self.max_fitness),
-                "Last Fitness: {:.0f}".format(self.last_fitness)]
+        key = (self.generation, self.individual_number, self.max_fitness, self.last_fitness)
+        if key != self.stats_key:
+            self.stats_key = key
+            self.stats = ["Generation: {}".format(self.generation),
+                          "Individual: {}".format(self.individual_number),
+                          "Max Fitness: {:.0f}".format(self.max_fitness),
+                          "Last Fitness: {:.0f}".format(self.last_fitness)]
+        return self.stats
 
     def generation_history(self):
         """
         :return: A list of strings displaying statistics about the last 5 generations
         """
-        fitness_history = self.reporter.get_fitness_mean()
-        start_generation = max(0, len(fitness_history) - 5)
+        generations = self.reporter.generations
+        if generations == self.history_length:
+            return self.history
+
+        last_five_generations = self.reporter.get_fitness_means(HISTORY_LENGTH)
+        start_generation = generations - len(last_five_generations)
         start_generation += 1  # plus one so this is no longer zero-indexed
         stats = []
-        last_five_generations = fitness_history[-5:]
         for gen, fitness in enumerate(last_five_generations):
             stat = "Generation {} Average: {:.0f}".format(gen + start_generation, fitness)
             stats.append(stat)
 
+        self.history_length = generations
+        self.history = stats
         return stats
 
     def next_individual(self):
@@ -43,5 +63,3 @@ class PopulationStats:
     def next_generation(self):
         self.generation += 1
         self.individual_number = 1
-
-
@@ -1,4 +1,5 @@
-import pygame
+import math
+from collections import Counter
 
 PROGRESS_TIMEOUT = 5000  # end if no progress is made for this many
 FALL_SIM_TIME = 1000  # number of milliseconds to simulate after a fall
@@ -9,9 +10,22 @@ class RunTerminator:
     Class that maintains the active state of the current run. Determines when simulation should be stopped
     """
 
-    def __init__(self):
+    def __init__(self, get_ticks=None, progress_timeout=PROGRESS_TIMEOUT, fall_sim_time=FALL_SIM_TIME):
+        """
+        :param get_ticks: function that returns the current time, defaults to the pygame clock in milliseconds
+        :param progress_timeout: end if no progress is made for this long, in the units of get_ticks
+        :param fall_sim_time: amount of time to simulate after a fall, in the units of get_ticks
+        """
+        if get_ticks is None:
+            # only wall clock runs need pygame, so it isn't imported until one starts
+            import pygame
+            get_ticks = pygame.time.get_ticks
+
+        self.get_ticks = get_ticks
+        self.progress_timeout = progress_timeout
+        self.fall_sim_time = fall_sim_time
         self.fall_time = None
-        self.last_progress_time = pygame.time.get_ticks()
+        self.last_progress_time = get_ticks()
         self.last_distance = 0
 
     def update(self, body):
@@ -21,14 +35,20 @@ class RunTerminator:
         """
         if body.get_distance() > self.last_distance:
             self.last_distance = body.get_distance()
-            self.last_progress_time = pygame.time.get_ticks()
+            self.last_progress_time = self.get_ticks()
+
+    def step(self):
+        """
+        Called after every physics step. The wall clock keeps running on its own, so there's nothing to do here
+        """
+        pass
 
     def fall(self):
         """
         Called to signal that Jerry has fallen, only count first fall time.
         """
         if self.fall_time is None:
-            self.fall_time = pygame.time.get_ticks()
+            self.fall_time = self.get_ticks()
 
     def has_fallen(self):
         return self.fall_time is not None
@@ -37,11 +57,215 @@ class RunTerminator:
         """
         Returns true if the current run should be stopped
         """
-        current_time = pygame.time.get_ticks()
+        current_time = self.get_ticks()
 
-        if self.has_fallen() and current_time - self.fall_time > FALL_SIM_TIME:
+        if self.has_fallen() and current_time - self.fall_time > self.fall_sim_time:
             return True
-        elif current_time - self.last_progress_time > PROGRESS_TIMEOUT:
+        elif current_time - self.last_progress_time > self.progress_timeout:
             return True
         else:
             return False
+
+
+class StepTerminator(RunTerminator):
+    """
+    RunTerminator that measures time in physics steps instead of wall clock time. Runs have the same simulated length
+    no matter how fast the host runs them, so fitness scores can be compared between machines.
+    """
+
+    def __init__(self, period, time_limit=None, early_stop_rules=()):
+        """
+        :param period: length of one physics step in seconds
+        :param time_limit: optional seconds of simulated time after which the run ends no matter what
+        :param early_stop_rules: EarlyStopRules that can end the run sooner, new ones for every run
+        """
+        self.steps = 0
+        self.period = period
+        self.max_steps = self.steps_for(time_limit * 1000) if time_limit is not None else None
+        self.early_stop_rules = early_stop_rules
+        self.stopped_by = None  # name of the early stop rule that ended the run
+        super().__init__(self.get_steps, self.steps_for(PROGRESS_TIMEOUT), self.steps_for(FALL_SIM_TIME))
+
+    def steps_for(self, milliseconds):
+        """
+        :return: the number of physics steps that cover the given amount of simulated time
+        """
+        return round(milliseconds / 1000 / self.period)
+
+    def get_steps(self):
+        return self.steps
+
+    def get_simulation_time(self):
+        """
+        :return: simulated time since the run started, in seconds
+        """
+        return self.steps * self.period
+
+    def step(self):
+        """
+        Called after every physics step, advances the simulated clock
+        """
+        self.steps += 1
+
+    def update(self, body):
+        """
+        Checks for progress, then asks each early stop rule whether the run can end now
+        """
+        super().update(body)
+        for rule in self.early_stop_rules:
+            if rule.should_stop(body, self):
+                self.stopped_by = rule.name
+                early_stop_stats.add(rule.name, self.remaining_steps())
+                break
+
+    def remaining_steps(self):
+        """
+        :return: number of physics steps the run would still take without early stop rules, assuming Jerry neither
+        falls nor makes progress from here on
+        """
+        end = self.last_progress_time + self.progress_timeout + 1
+        if self.has_fallen():
+            end = min(end, self.fall_time + self.fall_sim_time + 1)
+        if self.max_steps is not None:
+            end = min(end, self.max_steps)
+        return max(0, end - self.steps)
+
+    def run_complete(self):
+        """
+        Returns true if the current run should be stopped, either for the usual reasons, because it reached the time
+        limit, or because an early stop rule ended it
+        """
+        if self.stopped_by is not None:
+            return True
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return True
+        return super().run_complete()
+
+
+class EarlyStopRule:
+    """
+    Ends a headless run as soon as its fitness score can't change much anymore, instead of simulating until the run
+    terminator's timeouts. Rules keep state, so each run gets new ones from Config.get_early_stop_rules
+    """
+    name = None  # short name that steps saved are reported under
+
+    def should_stop(self, body, terminator):
+        """
+        Called once every control step, after the terminator has checked for progress
+        :param body: Body being simulated
+        :param terminator: StepTerminator of the run, used for its step count and period
+        :return: True to end the run now
+        """
+        return False
+
+
+class FallStop(EarlyStopRule):
+    """
+    Ends the run as soon as Jerry falls. Fitness calculators aren't updated after a fall, so the FALL_SIM_TIME that
+    would otherwise be simulated only matters when someone is watching
+    """
+    name = "fall"
+
+    def should_stop(self, body, terminator):
+        return terminator.has_fallen()
+
+
+class TiltStop(EarlyStopRule):
+    """
+    Ends the run once the torso has leaned further than max_angle for duration seconds in a row. Past the walking
+    score's 30 degrees a step is worth nothing, and Jerry rarely straightens up again. Opt-in only, this is a guess,
+    not a proof: if Jerry would have recovered, the points earned afterwards are lost, and the headless score can be
+    lower than the rendered replay's, which always runs in full
+    """
+    name = "tilt"
+
+    def __init__(self, max_angle=math.pi / 6, duration=1.0):
+        """
+        :param max_angle: torso angle in radians past which Jerry counts as tilted
+        :param duration: seconds Jerry has to stay tilted
+        """
+        self.max_angle = max_angle
+        self.duration = duration
+        self.tilted_since = None  # step at which Jerry started leaning too far
+
+    def should_stop(self, body, terminator):
+        if abs(body.get_angle()) <= self.max_angle:
+            self.tilted_since = None
+            return False
+
+        if self.tilted_since is None:
+            self.tilted_since = terminator.steps
+        return terminator.steps - self.tilted_since >= terminator.steps_for(self.duration * 1000)
+
+
+class RotationStall(EarlyStopRule):
+    """
+    Ends the run once the torso hasn't turned more than min_rotation away from where it was for duration seconds.
+    Backflip runs score rotation, not distance, so the usual progress timeout keeps them going long after they've
+    stopped flipping. Opt-in only, this changes scores: the backflip score adds up signed rotation, so whatever a run
+    would still have turned, forwards or backwards, is cut off, and the headless score no longer matches the rendered
+    replay's
+    """
+    name = "rotation_stall"
+
+    def __init__(self, min_rotation=math.pi / 4, duration=2.0):
+        """
+        :param min_rotation: rotation in radians that counts as progress
+        :param duration: seconds without progress after which the run ends
+        """
+        self.min_rotation = min_rotation
+        self.duration = duration
+        self.angle = None  # torso angle when progress was last made
+        self.since = None  # step at which progress was last made
+
+    def should_stop(self, body, terminator):
+        angle = body.get_angle()
+        if self.angle is None or abs(angle - self.angle) > self.min_rotation:
+            self.angle = angle
+            self.since = terminator.steps
+            return False
+        return terminator.steps - self.since >= terminator.steps_for(self.duration * 1000)
+
+
+class EarlyStopStats:
+    """
+    Counts the runs ended by each early stop rule and the physics steps they saved, which is how many steps the runs
+    would still have taken if nothing else had happened
+    """
+
+    def __init__(self):
+        self.stops = Counter()
+        self.saved_steps = Counter()
+
+    def add(self, rule_name, saved_steps):
+        self.stops[rule_name] += 1
+        self.saved_steps[rule_name] += saved_steps
+
+    def take(self):
+        """
+        Removes everything counted so far, used by worker processes to send their counts back
+        :return: (stops, saved_steps) that can be passed to merge
+        """
+        taken = self.stops, self.saved_steps
+        self.stops = Counter()
+        self.saved_steps = Counter()
+        return taken
+
+    def merge(self, taken):
+        """
+        Adds counts returned by another EarlyStopStats' take
+        """
+        stops, saved_steps = taken
+        self.stops.update(stops)
+        self.saved_steps.update(saved_steps)
+
+    def format(self):
+        """
+        :return: list of strings, one line per rule that ended a run
+        """
+        return ["Early stop {}: {} runs, {} steps saved".format(name, self.stops[name], self.saved_steps[name])
+                for name in sorted(self.stops)]
+
+
+# runs ended early in this process, StepTerminator adds to it
+early_stop_stats = EarlyStopStats()
@@ -1,15 +1,39 @@
+import multiprocessing
+import os
+import random
 import sys
+import time
+from functools import partial
 
-from neat import nn, population
+from neat import population
 
-from jerry import record, stats
+from jerry import evaluation, fitness_cache, metrics, profiling, record, screening, stats, termination
 from jerry import simulator
 from jerry.simulations import backflip, walking
 
 pop_stats = stats.PopulationStats()
 sim = simulator.Simulator(pop_stats)
 record_genomes = False
+render_champion = True  # replay the best genome of each generation on screen, all others run headless
 simulation_config = backflip.BackflipConfig()
+num_workers = multiprocessing.cpu_count()  # processes used to evaluate each generation, 1 evaluates in this process
+batch_size = 1  # genomes simulated together in one space, a single space.step moves all of them
+vectorize_batches = True  # activate the networks of a whole batch at once with NumPy
+record_trajectories = False  # save every headless run in the record folder so it can be watched with jerry.replay
+profile = False  # time each phase of every simulation, summaries are printed and saved in the record folder
+profiler = None
+# append a summary of every generation to metrics.jsonl in the record folder, summaries that no longer fit in memory
+# are also spilled to generations.f64, see metrics.read_spilled
+log_metrics = False
+metrics_port = None  # if set, the latest generation's metrics are served at http://localhost:<port>/metrics
+# if set, NEAT's random numbers are seeded with it and batches aren't activated with NumPy, so the same seed and
+# settings always give the same run, see jerry.verify
+seed = None
+cache_fitness = False  # reuse the scores of genomes that were already evaluated, see jerry.fitness_cache
+fitness_cache_path = None  # if set, cached scores are loaded from and saved to this JSON file, so later runs reuse them
+cache = None
+evaluator = None
+coordinator = None  # distributed.Coordinator, if set generations are evaluated on remote workers instead
 
 
 def population_fitness(genomes, neat_config):
@@ -19,35 +43,166 @@ def population_fitness(genomes, neat_config):
     :param neat_config: NEAT config
     """
     pop_stats.individual_number = 1
-    for genome_id, genome in genomes:
-        net = nn.FeedForwardNetwork.create(genome, neat_config)
-        body = simulation_config.get_body()
-        motion_calculator = simulation_config.get_motion_calculator(net)
-        fitness_calculator = simulation_config.get_fitness_calculator()
-        last_fitness = sim.evaluate(body, motion_calculator, fitness_calculator)
+    champion = None
+    start = time.perf_counter()
+    schedule = simulation_config.screening
+    promoted = None  # indices of the genomes scored at full fidelity, None if every genome was
+    if schedule is not None and schedule.applies_to(pop_stats.generation):
+        results, promoted = screening.screen(genomes, schedule, partial(evaluate_population, neat_config=neat_config))
+        print("Screened {} genomes, {} evaluated at full fidelity".format(len(genomes), len(promoted)))
+    else:
+        results = evaluate_population(genomes, neat_config)
 
+    for index, (genome, last_fitness) in enumerate(results):
         pop_stats.last_fitness = last_fitness
         genome.fitness = last_fitness
 
+        if champion is None or last_fitness > champion.fitness:
+            champion = genome
+
         # todo move this logic into population stats
         if last_fitness > pop_stats.max_fitness:
             pop_stats.max_fitness = last_fitness
-            if record_genomes:
-                record.save_genome(genome, last_fitness, pop_stats.generation)
+            # screened scores can't be reproduced by a single run, so only full fidelity scores are recorded
+            if record_genomes and (promoted is None or index in promoted):
+                record.save_genome(genome, last_fitness, pop_stats.generation, get_metadata(neat_config))
         pop_stats.next_individual()
+    pop_stats.reporter.set_evaluation_time(time.perf_counter() - start)
+
+    if render_champion and champion is not None:
+        show_genome(champion, neat_config)
+
+    for line in termination.early_stop_stats.format():
+        print(line)
+    termination.early_stop_stats.take()
+
+    if cache is not None:
+        print("Fitness cache: {} hits, {} misses".format(*cache.take_stats()))
+        if cache.path is not None:
+            cache.save()
+
+    if profiler is not None:
+        profiler.count("genomes", len(genomes))
+        for line in profiling.format_summary(profiler.summarize(pop_stats.generation)):
+            print(line)
+        profiler.export(record.folder_path)
 
     pop_stats.next_generation()
 
 
+def evaluate_population(genomes, neat_config, screened=False):
+    """
+    Evaluates every genome, only those without a cached score are simulated when caching
+    :param genomes: list of (genome_id, genome) tuples
+    :param neat_config: NEAT config
+    :param screened: whether to run the simulation Config's cheap screening evaluation
+    :return: iterable of (genome, fitness) tuples in the same order as genomes
+    """
+    if cache is None:
+        return simulate_population(genomes, neat_config, screened)
+
+    config = simulation_config.get_screening_config() if screened else simulation_config
+    return cache.evaluate(genomes, neat_config, config,
+                          partial(simulate_population, neat_config=neat_config, screened=screened))
+
+
+def simulate_population(genomes, neat_config, screened=False):
+    """
+    Runs a headless simulation of every genome, on remote workers if there is a coordinator, otherwise spread over a
+    pool of worker processes if num_workers > 1
+    :param genomes: list of (genome_id, genome) tuples
+    :param neat_config: NEAT config
+    :param screened: whether to run the simulation Config's cheap screening evaluation
+    :return: iterable of (genome, fitness) tuples in the same order as genomes
+    """
+    global evaluator
+    if coordinator is not None:
+        config = simulation_config.get_screening_config() if screened else simulation_config
+        results = coordinator.evaluate(genomes, config)
+        for line in coordinator.report():
+            print(line)
+        return results
+
+    trajectory_dir = os.path.join(record.folder_path, "trajectories") if record_trajectories else None
+    if num_workers <= 1:
+        population = [genome for genome_id, genome in genomes]
+        config = simulation_config.get_screening_config() if screened else simulation_config
+        fitnesses = evaluation.evaluate_in_batches(population, neat_config, config, batch_size, get_vectorize(),
+                                                   trajectory_dir, profiler, pop_stats.generation, screened)
+        return zip(population, fitnesses)
+
+    if evaluator is None:
+        evaluator = evaluation.ParallelEvaluator(num_workers, neat_config, simulation_config, batch_size,
+                                                 get_vectorize(), trajectory_dir, profiler)
+    return evaluator.evaluate(genomes, screened, pop_stats.generation)
+
+
+def get_vectorize():
+    """
+    :return: whether batches activate their networks with NumPy, never when caching or seeded because NumPy doesn't
+    round exactly like the compiled networks that single runs and replays use
+    """
+    return vectorize_batches and cache is None and seed is None
+
+
+def get_metadata(neat_config):
+    """
+    :return: dict of everything needed to evaluate a recorded genome again, saved alongside it, or None when batches
+    are activated with NumPy, jerry.verify couldn't reproduce their scores
+    """
+    if batch_size > 1 and get_vectorize():
+        return None
+    metadata = {"simulation": simulation_config.name,
+                "settings": fitness_cache.simulation_key(simulation_config, neat_config),
+                "seed": seed}
+    metadata.update(simulation_config.get_settings())
+    return metadata
+
+
+def show_genome(genome, neat_config):
+    """
+    Replays a single genome on screen at normal speed
+    :param genome: genome that has already been evaluated
+    :param neat_config: NEAT config
+    """
+    net = simulation_config.get_network(genome, neat_config)
+    body = simulation_config.get_body()
+    motion_calculator = simulation_config.get_motion_calculator(net)
+    fitness_calculator = simulation_config.get_fitness_calculator()
+    sim.evaluate(body, motion_calculator, fitness_calculator,
+                 recording_name="genome_{}/gen_{}".format(genome.key, pop_stats.generation),
+                 physics_profile=simulation_config.get_physics_profile())
+
+
 def main():
+    global profiler, cache
+    if seed is not None:
+        random.seed(seed)
     if record_genomes:
         record.create_folder()
+    if profile:
+        profiler = profiling.Profiler()
+        sim.profiler = profiler
+    if log_metrics:
+        pop_stats.reporter.log_path = os.path.join(record.folder_path, "metrics.jsonl")
+        pop_stats.reporter.spill_path = os.path.join(record.folder_path, "generations.f64")
+    if cache_fitness:
+        cache = fitness_cache.FitnessCache(path=fitness_cache_path)
+    metrics_server = metrics.MetricsServer(pop_stats.reporter, metrics_port) if metrics_port is not None else None
 
     config = simulation_config.get_neat_config()
     pop = population.Population(config)
     pop.add_reporter(pop_stats.reporter)
     pop.run(population_fitness, n=100)
 
+    sim.close()
+    if metrics_server is not None:
+        metrics_server.close()
+    if evaluator is not None:
+        evaluator.close()
+    if coordinator is not None:
+        coordinator.close()
+
 
 if __name__ == '__main__':
     sys.exit(main())
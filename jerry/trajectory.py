@@ -0,0 +1,97 @@
+"""
+Records what happens during a headless run so it can be watched later with jerry.replay, without drawing anything
+while training. Each episode is saved as a compressed .npz file of float32 arrays with one row per control step:
+    states: BodyState read before each step
+    commands: BodyCommand applied during each step
+    poses: (x, y, angle) of every segment in the order of Body.get_segments, so poses[:, 0, :2] is the torso position
+    fitnesses: fitness score before each step
+along with the name of the simulation Config, the time between rows, and the final fitness score.
+"""
+import os
+from array import array
+
+import numpy as np
+
+from jerry.body import BodyCommand, BodyState
+
+
+class TrajectoryRecorder:
+    """
+    Frame callback for physics.run that appends the body's state, command, and pose to flat buffers every step
+    """
+
+    def __init__(self, body, period):
+        """
+        :param body: Body being simulated
+        :param period: seconds of simulated time between control steps
+        """
+        self.body = body
+        self.period = period
+        self.segments = body.get_segments()
+        self.states = array('d')
+        self.commands = array('d')
+        self.poses = array('d')
+        self.fitnesses = array('d')
+
+    def record(self, fitness_calculator):
+        """
+        Stores the current step, called after the body's command has been applied and before the space is stepped
+        :param fitness_calculator: fitness calculator of the run
+        """
+        self.states.extend(self.body.state_buffer)
+        self.commands.extend(self.body.command_buffer)
+        for segment in self.segments:
+            position = segment.body.position
+            self.poses.extend((position.x, position.y, segment.body.angle))
+        self.fitnesses.append(fitness_calculator.get_fitness())
+
+    def save(self, path, simulation_name, fitness):
+        """
+        Writes the recorded episode, parent directories are created if needed
+        :param path: path of the .npz file
+        :param simulation_name: name of the Config that was simulated
+        :param fitness: final fitness score
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path,
+                            states=to_rows(self.states, len(BodyState._fields)),
+                            commands=to_rows(self.commands, len(BodyCommand._fields)),
+                            poses=to_rows(self.poses, len(self.segments) * 3).reshape(-1, len(self.segments), 3),
+                            fitnesses=np.frombuffer(self.fitnesses).astype(np.float32),
+                            simulation=simulation_name,
+                            period=self.period,
+                            fitness=fitness)
+
+
+def to_rows(values, row_length):
+    """
+    :return: float32 array with one row of row_length values per step
+    """
+    return np.frombuffer(values).astype(np.float32).reshape(-1, row_length)
+
+
+def get_path(directory, genome, generation, screened=False):
+    """
+    Every run gets its own file, genomes that survive into later generations and screened genomes that are evaluated
+    again at full fidelity are simulated more than once
+    :param directory: directory that trajectories are recorded into
+    :param genome: genome that was simulated
+    :param generation: generation number of the run
+    :param screened: whether the run was a cheap screening run, see jerry.screening
+    :return: path of the run's trajectory inside directory, i.e. gen_3/genome_12_full.npz
+    """
+    filename = "genome_{}_{}.npz".format(genome.key, "screening" if screened else "full")
+    return os.path.join(directory, "gen_{}".format(generation), filename)
+
+
+def load(path):
+    """
+    Loads a recorded episode
+    :param path: path of the .npz file
+    :return: dict of every array in the file, with simulation, period, and fitness as plain Python values
+    """
+    with np.load(path) as data:
+        trajectory = {key: data[key] for key in data.files}
+    for key in ("simulation", "period", "fitness"):
+        trajectory[key] = trajectory[key].item()
+    return trajectory
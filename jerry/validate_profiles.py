@@ -0,0 +1,161 @@
+"""
+Measures how far fitness scores and rankings drift between physics profiles, so a cheaper profile can be chosen
+knowing what it costs in accuracy. Every genome is evaluated with each profile and compared with the baseline profile.
+Run from the repository root with:
+    python -m jerry.validate_profiles --simulation walking --count 100
+or compare saved genomes, e.g. the champions of a run:
+    python -m jerry.validate_profiles --simulation backflip records/<run>/*.pickle
+"""
+import argparse
+import contextlib
+import json
+import os
+import pickle
+import random
+import sys
+import time
+
+import numpy as np
+
+from jerry import evaluation
+from jerry.physics import physics_profiles
+from jerry.simulations import simulation_configs
+
+SEED = 1
+MUTATIONS = 30  # mutations applied to each random genome, so they're about the size of trained genomes
+TOP_FRACTION = 0.2  # share of the best genomes compared by top_overlap
+
+
+def create_genomes(neat_config, count):
+    """
+    :return: list of count seeded random genomes, mutated MUTATIONS times each
+    """
+    random.seed(SEED)
+    genomes = []
+    for key in range(count):
+        genome = neat_config.genome_type(key)
+        genome.configure_new(neat_config.genome_config)
+        for _ in range(MUTATIONS):
+            genome.mutate(neat_config.genome_config)
+        genomes.append(genome)
+    return genomes
+
+
+def load_genomes(paths):
+    """
+    :param paths: paths of genomes pickled by record.save_genome
+    :return: list of genomes
+    """
+    genomes = []
+    for path in paths:
+        with open(path, 'rb') as handle:
+            genomes.append(pickle.load(handle))
+    return genomes
+
+
+def rank(values):
+    """
+    :return: rank of each value starting at 0, tied values share the average of their ranks
+    """
+    values = np.asarray(values)
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values, kind="mergesort")] = np.arange(len(values))
+    for value in np.unique(values):
+        tied = values == value
+        ranks[tied] = ranks[tied].mean()
+    return ranks
+
+
+def compare(baseline, fitnesses, top_fraction=TOP_FRACTION):
+    """
+    :param baseline: fitness scores from the baseline profile
+    :param fitnesses: fitness scores of the same genomes from another profile
+    :return: dict with the Spearman rank correlation, the share of the baseline's top genomes that are also on top
+    with the other profile, and the mean and max absolute fitness difference
+    """
+    baseline = np.asarray(baseline)
+    fitnesses = np.asarray(fitnesses)
+    baseline_ranks = rank(baseline)
+    ranks = rank(fitnesses)
+    if baseline_ranks.std() == 0 or ranks.std() == 0:
+        spearman = float("nan")
+    else:
+        spearman = float(np.corrcoef(baseline_ranks, ranks)[0, 1])
+
+    top = max(1, int(round(len(baseline) * top_fraction)))
+    baseline_top = set(np.argsort(-baseline, kind="mergesort")[:top].tolist())
+    profile_top = set(np.argsort(-fitnesses, kind="mergesort")[:top].tolist())
+    differences = np.abs(fitnesses - baseline)
+    return {"spearman": spearman,
+            "top_overlap": len(baseline_top & profile_top) / top,
+            "mean_abs_difference": float(differences.mean()),
+            "max_abs_difference": float(differences.max())}
+
+
+def evaluate_with_profile(genomes, neat_config, simulation_config, profile_name):
+    """
+    Evaluates every genome with one physics profile
+    :return: (list of fitness scores, seconds taken)
+    """
+    simulation_config.physics_profile = profile_name
+    # the backflip motion calculator prints every step
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        fitnesses = [evaluation.evaluate_genome(genome, neat_config, simulation_config) for genome in genomes]
+        return fitnesses, time.perf_counter() - start
+
+
+def validate(simulation_config, genomes, profile_names, baseline_name):
+    """
+    :param simulation_config: Config of the simulation to run
+    :param genomes: list of genomes
+    :param profile_names: names of the profiles to compare
+    :param baseline_name: name of the profile every other profile is compared with
+    :return: dict of the results for each profile
+    """
+    neat_config = simulation_config.get_neat_config()
+    runs = {name: evaluate_with_profile(genomes, neat_config, simulation_config, name)
+            for name in [baseline_name] + [name for name in profile_names if name != baseline_name]}
+    baseline_fitnesses, baseline_seconds = runs[baseline_name]
+
+    results = {}
+    for name, (fitnesses, seconds) in runs.items():
+        result = compare(baseline_fitnesses, fitnesses)
+        result["episodes_per_second"] = len(genomes) / seconds
+        result["speedup"] = baseline_seconds / seconds
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fitness rankings between physics profiles")
+    parser.add_argument("genomes", nargs="*", help="pickled genomes, random genomes are used if there are none")
+    parser.add_argument("--simulation", choices=sorted(simulation_configs), default="walking")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(physics_profiles), default=sorted(physics_profiles))
+    parser.add_argument("--baseline", choices=sorted(physics_profiles), default="reference")
+    parser.add_argument("--count", type=int, default=100, help="number of random genomes")
+    parser.add_argument("--output", help="path of a JSON file to write results to")
+    args = parser.parse_args()
+
+    simulation_config = simulation_configs[args.simulation]()
+    if args.genomes:
+        genomes = load_genomes(args.genomes)
+    else:
+        genomes = create_genomes(simulation_config.get_neat_config(), args.count)
+
+    results = validate(simulation_config, genomes, args.profiles, args.baseline)
+    print("{} genomes, compared with {}".format(len(genomes), args.baseline))
+    for name, result in results.items():
+        print("{:>12}: spearman {:.3f}, top {:.0%} overlap {:.2f}, mean |diff| {:.2f}, max |diff| {:.2f}, "
+              "{:.1f} episodes/s ({:.2f}x)".format(name, result["spearman"], TOP_FRACTION, result["top_overlap"],
+                                                   result["mean_abs_difference"], result["max_abs_difference"],
+                                                   result["episodes_per_second"], result["speedup"]))
+
+    if args.output is not None:
+        with open(args.output, 'w') as handle:
+            json.dump({"simulation": args.simulation, "baseline": args.baseline, "genomes": len(genomes),
+                       "results": results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
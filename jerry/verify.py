@@ -0,0 +1,109 @@
+"""
+Checks that recorded genomes still get the score they were saved with. Every genome pickled by record.save_genome
+that has a metadata file is evaluated again with the settings it was recorded with, twice, and both runs must give
+exactly the saved fitness and bit for bit the same trajectory. Run from the repository root with:
+    python -m jerry.verify records/<run>
+Exits with status 1 if any genome diverges.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import pickle
+import sys
+
+from jerry import evaluation, fitness_cache, record, trajectory
+from jerry.simulations import simulation_configs
+
+
+def load_config(metadata):
+    """
+    :param metadata: dict saved by record.save_genome
+    :return: simulation Config with the recorded physics profile and time limit
+    """
+    simulation_config = simulation_configs[metadata["simulation"]]()
+    simulation_config.apply_settings(metadata)
+    return simulation_config
+
+
+def run(genome, neat_config, simulation_config):
+    """
+    Evaluates a genome the way training does, recording its trajectory
+    :return: (fitness score, TrajectoryRecorder)
+    """
+    net = simulation_config.get_network(genome, neat_config)
+    motion_calculator = simulation_config.get_motion_calculator(net)
+    fitness_calculator = simulation_config.get_fitness_calculator()
+    context = evaluation.get_context(simulation_config)
+    recorder = trajectory.TrajectoryRecorder(context.body, context.physics_profile.control_period)
+    # the backflip motion calculator prints every step
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        fitness = context.simulate(motion_calculator, fitness_calculator, recorder.record)
+    return fitness, recorder
+
+
+def same_trajectory(first, second):
+    """
+    :return: whether two TrajectoryRecorders hold bit for bit the same run
+    """
+    return all(getattr(first, name).tobytes() == getattr(second, name).tobytes()
+               for name in ("states", "commands", "poses", "fitnesses"))
+
+
+def verify_genome(genome_path):
+    """
+    :param genome_path: path of a pickled genome
+    :return: list of problems found, empty if the genome reproduces exactly
+    """
+    with open(record.get_metadata_path(genome_path)) as handle:
+        metadata = json.load(handle)
+    with open(genome_path, 'rb') as handle:
+        genome = pickle.load(handle)
+
+    simulation_config = load_config(metadata)
+    neat_config = simulation_config.get_neat_config()
+    problems = []
+    settings = simulation_config.get_settings()
+    for name in ("physics_profile", "time_limit"):
+        if settings[name] != metadata[name]:
+            problems.append("{} {!r} instead of the recorded {!r}".format(name, settings[name], metadata[name]))
+    if not problems and fitness_cache.simulation_key(simulation_config, neat_config) != metadata["settings"]:
+        problems.append("simulation code, early stop rules, or pymunk version changed since the genome was recorded")
+
+    first_fitness, first_trajectory = run(genome, neat_config, simulation_config)
+    second_fitness, second_trajectory = run(genome, neat_config, simulation_config)
+    if float(first_fitness).hex() != metadata["fitness_hex"]:
+        problems.append("fitness {!r} instead of {!r}".format(first_fitness, metadata["fitness"]))
+    if float(second_fitness) != float(first_fitness) or not same_trajectory(first_trajectory, second_trajectory):
+        problems.append("two runs in a row diverged")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that recorded genomes reproduce their saved scores")
+    parser.add_argument("folder", help="record folder of a run, i.e. records/<run>")
+    args = parser.parse_args()
+
+    diverged = 0
+    for genome_path in sorted(glob.glob(os.path.join(args.folder, "*.pickle"))):
+        name = os.path.basename(genome_path)
+        if not os.path.exists(record.get_metadata_path(genome_path)):
+            print("{}: skipped, recorded without metadata".format(name))
+            continue
+
+        problems = verify_genome(genome_path)
+        if problems:
+            diverged += 1
+            print("{}: {}".format(name, "; ".join(problems)))
+        else:
+            print("{}: reproduced".format(name))
+
+    if diverged:
+        print("{} genomes diverged".format(diverged))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+import contextlib
+import os
+import unittest
+
+from jerry import evaluation, termination
+from jerry.simulations import backflip
+from jerry.validate_profiles import create_genomes
+
+GENOMES = 30
+
+
+class BatchTest(unittest.TestCase):
+
+    def test_batch_matches_single_runs(self):
+        """
+        Random backflip genomes fall at different times, so bodies in a batch finish while others are still running.
+        Every score must still be exactly what the genome gets in a space of its own
+        """
+        simulation_config = backflip.BackflipConfig()
+        neat_config = simulation_config.get_neat_config()
+        genomes = create_genomes(neat_config, GENOMES)
+
+        termination.early_stop_stats.take()
+        # the backflip motion calculator prints every step
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            single = [evaluation.evaluate_genome(genome, neat_config, simulation_config) for genome in genomes]
+            stops, saved_steps = termination.early_stop_stats.take()
+            batched = evaluation.evaluate_genomes(genomes, neat_config, simulation_config)
+
+        self.assertGreater(stops[termination.FallStop.name], 0)
+        self.assertEqual(single, batched)
+
+
+if __name__ == '__main__':
+    unittest.main()